@@ -23,6 +23,14 @@ TEMP_DIR = "temp"
 MAX_AUDIO_CHUNK_DURATION = 300  # 5 minutes in seconds
 AUDIO_OVERLAP_DURATION = 30  # 30 seconds overlap
 KEYFRAME_INTERVAL = 60  # Extract keyframe every 60 seconds
+# Hardware video decoding for frame extraction: "auto" lets ffmpeg use any available GPU
+# decoder (cuda, vaapi, videotoolbox, ...) and fall back to software; "none" disables
+FFMPEG_HWACCEL = os.getenv("FFMPEG_HWACCEL", "auto")
+# Frames are normally grabbed with one seek + short decode each. A single pass over the
+# whole file only pays off when it would decode most of it anyway: keyframe intervals
+# below this many seconds, or dense windows covering at least this share of the video
+KEYFRAME_SINGLE_PASS_MAX_INTERVAL = 5
+DENSE_SINGLE_PASS_COVERAGE = 0.8
 MAX_FRAMES_PER_VIDEO = 120  # Maximum frames to extract
 MAX_ANALYSIS_FRAMES = 150 # Max frames to send to Gemini for deep analysis (Phase 2)
 # Concurrency Configuration (Tune based on Server RAM and API Limits)
@@ -32,8 +40,39 @@ MAX_ANALYSIS_FRAMES = 150 # Max frames to send to Gemini for deep analysis (Phas
 MAX_CONCURRENT_TRANSCRIBES = 2   
 MAX_CONCURRENT_VISION_TASKS = 2
 MAX_CONCURRENT_UPLOADS = 3
+MAX_CONCURRENT_PLAYLIST_VIDEOS = 3
+# Playlist videos processed one at a time first, so later chapters get their summaries as context
+PLAYLIST_SERIAL_PREFIX = 1
+# Worker processes for frame hashing / blur scoring (1 keeps it in-process).
+# Each worker is a separate Python process that re-imports the app (~100MB+ each):
+# For Render Free (512MB): Use 1
+# For Render Pro (4GB+) with several CPUs: Use up to the CPU count
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 1))
+
+# Gemini quota budgets, per minute and shared by all jobs (see utils/credit_sem.py).
+# Calls are charged by estimated cost and credits come back a minute after each call.
+# These only cap throughput against API quotas; the MAX_CONCURRENT_* semaphores above
+# still bound how many calls a job has in flight (and so its memory use).
+# The audio default holds at most MAX_CONCURRENT_TRANSCRIBES full chunks at once
+GEMINI_AUDIO_SECONDS_PER_MINUTE = int(os.getenv(
+    "GEMINI_AUDIO_SECONDS_PER_MINUTE",
+    MAX_CONCURRENT_TRANSCRIBES * MAX_AUDIO_CHUNK_DURATION
+))
+GEMINI_VISION_RPM = int(os.getenv("GEMINI_VISION_RPM", 1000))
+GEMINI_VISION_TPM = int(os.getenv("GEMINI_VISION_TPM", 1000000))
+GEMINI_TOKENS_PER_FRAME = 600  # ~258 image tokens + Gatekeeper prompt/response
+GEMINI_QUOTA_WINDOW = 60  # seconds
+# A Gatekeeper frame whose Vision credits won't free up within this many seconds is kept
+# unevaluated instead of waiting out the quota window
+GATEKEEPER_MAX_CREDIT_WAIT = 10
+
+# Skip the Gatekeeper when audio-cue windows already cover more than this share of the video
+GATEKEEPER_SKIP_COVERAGE = 0.5
 
 AUDIO_SAMPLE_RATE = 16000  # 16kHz for transcription
+TRANSCRIPT_CACHE_TTL_DAYS = 30  # Reuse transcripts of already-processed videos for this long
+FRAME_EVAL_CACHE_TTL_DAYS = 7  # Reuse Gatekeeper verdicts for identical frames (by dHash) for this long
+PHASH_CACHE_TTL_DAYS = 7  # Reuse frame dHashes (keyed by JPEG content) across reruns for this long
 
 # Credit System Configuration
 SIGNUP_BONUS_CREDITS = 100  # Credits given on first sign-up
@@ -43,6 +82,20 @@ PRIVATE_CREDIT_MULTIPLIER = 3  # Private videos cost 3x
 # YouTube Configuration (optional)
 YOUTUBE_COOKIES_PATH = os.getenv("YOUTUBE_COOKIES_PATH", None)  # Path to cookies.txt file
 YOUTUBE_COOKIES_FROM_BROWSER = os.getenv("YOUTUBE_COOKIES_FROM_BROWSER", None)  # e.g., "chrome", "firefox", "edge"
+PROXY_URL = os.getenv("PROXY_URL")  # Optional proxy for all yt-dlp requests
+# yt-dlp's player-JS/signature cache; kept out of /tmp so it survives between requests.
+# Clearing it just forces yt-dlp to fetch and parse the player again.
+YOUTUBE_CACHE_DIR = os.getenv("YOUTUBE_CACHE_DIR", os.path.join(TEMP_DIR, "yt-dlp-cache"))
+# Video/playlist metadata is reused from disk for this many seconds (0 disables the cache)
+YOUTUBE_METADATA_CACHE_TTL = int(os.getenv("YOUTUBE_METADATA_CACHE_TTL", "3600"))
+# Opt-in: start the second download format alongside the first if the first hasn't begun
+# downloading after YOUTUBE_HEDGE_DELAY seconds (typically stuck in extraction / bot checks).
+# Off by default since each hedge is an extra YouTube request, which can itself draw bot checks
+YOUTUBE_HEDGED_DOWNLOADS = os.getenv("YOUTUBE_HEDGED_DOWNLOADS", "false").lower() == "true"
+YOUTUBE_HEDGE_DELAY = float(os.getenv("YOUTUBE_HEDGE_DELAY", "10"))
+# Cache DNS lookups made by yt-dlp calls for this many seconds; yt-dlp resolves the same
+# YouTube hosts for every request. 0 (default) disables
+DNS_CACHE_TTL = float(os.getenv("DNS_CACHE_TTL", "0"))
 
 # API Configuration
 # Allow localhost for development, add your production domains here
@@ -58,5 +111,6 @@ CORS_ORIGINS = [
     "https://long-from-video-summariser-beyond-ai.onrender.com",
 ]
 
-# Ensure temp directory exists
+# Ensure temp and cache directories exist
 os.makedirs(TEMP_DIR, exist_ok=True)
+os.makedirs(YOUTUBE_CACHE_DIR, exist_ok=True)
@@ -15,6 +15,17 @@ async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
     # Startup
     await db.connect_db()
+    for collection, ttl_days in (
+        ("transcript_cache", config.TRANSCRIPT_CACHE_TTL_DAYS),
+        ("frame_eval_cache", config.FRAME_EVAL_CACHE_TTL_DAYS),
+    ):
+        try:
+            await db.get_db()[collection].create_index(
+                "created_at",
+                expireAfterSeconds=ttl_days * 24 * 3600
+            )
+        except Exception as e:
+            print(f"⚠️ Could not ensure {collection} TTL index: {e}")
     print("🚀 Video Intelligence Pipeline API started")
     print(f"📁 Temp directory: {config.TEMP_DIR}")
     print(f"🔑 Using model: {config.MODEL}")
@@ -38,6 +49,8 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown
+    from services.playwright_youtube_service import playwright_youtube_service
+    await playwright_youtube_service.close()
     await db.close_db()
     print("👋 API shutdown complete")
 
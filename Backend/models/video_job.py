@@ -4,6 +4,29 @@ from pydantic import BaseModel, Field
 from bson import ObjectId
 
 
+# Large job fields stored in the job_artifacts collection (same _id as the video_jobs
+# document) so status polling and report listings don't load them
+JOB_ARTIFACT_FIELDS = (
+    "transcript",
+    "audio_visual_cues",
+    "visual_rois",
+    "processing_windows",
+    "visual_subtopics",
+    "report",
+    "slide_summary",
+)
+
+# Artifacts only kept for debugging/re-processing; stored zlib-compressed as "<field>_z"
+# (see utils/compression.py)
+COMPRESSED_ARTIFACT_FIELDS = (
+    "audio_visual_cues",
+    "visual_rois",
+    "processing_windows",
+    "visual_subtopics",
+    "report",
+)
+
+
 class PyObjectId(ObjectId):
     @classmethod
     def __get_validators__(cls):
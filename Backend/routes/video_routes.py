@@ -7,6 +7,7 @@ from typing import List, Dict
 import os
 import shutil
 import json
+import asyncio
 
 from models.database import db
 from models.video_job import (
@@ -16,11 +17,13 @@ from models.video_job import (
     VideoJobResponse, 
     VideoJobResult,
     VideoJob,
-    ReportSummary
+    ReportSummary,
+    JOB_ARTIFACT_FIELDS
 )
 from services.pipeline import pipeline
-from services.gemini_service import GeminiService
+from services.gemini_service import gemini_service
 from services.credit_service import credit_service
+from utils.compression import unpack
 import config
 
 router = APIRouter(prefix="/api/videos", tags=["videos"])
@@ -231,7 +234,10 @@ async def get_job_status(job_id: str):
     try:
         database = db.get_db()
         
-        job = await database.video_jobs.find_one({"_id": ObjectId(job_id)})
+        job = await database.video_jobs.find_one(
+            {"_id": ObjectId(job_id)},
+            {field: 0 for field in JOB_ARTIFACT_FIELDS}  # Older jobs still embed them
+        )
         
         if not job:
             raise HTTPException(status_code=404, detail="Job not found")
@@ -288,6 +294,8 @@ async def get_job_results(job_id: str):
                 detail=f"Job failed: {job.get('error_message', 'Unknown error')}"
             )
         
+        artifacts = await _get_job_artifacts(database, job, "slide_summary")
+        
         return VideoJobResult(
             job_id=job_id,
             status=job.get("status"),
@@ -297,7 +305,7 @@ async def get_job_results(job_id: str):
             topics=job.get("topics", []),
             key_takeaways=job.get("key_takeaways", []),
             entities=job.get("entities", {}),
-            slide_summary=job.get("slide_summary", []),
+            slide_summary=artifacts["slide_summary"] or [],
             total_frames=job.get("total_frames", 0),
             processing_cost=job.get("processing_cost"),
             completed_at=job.get("completed_at"),
@@ -377,6 +385,7 @@ async def delete_job(job_id: str):
         
         # Delete from database
         await database.video_jobs.delete_one({"_id": ObjectId(job_id)})
+        await database.job_artifacts.delete_one({"_id": ObjectId(job_id)})
         
         return {"message": f"Job {job_id} deleted successfully"}
         
@@ -430,7 +439,7 @@ async def get_reports(
         skip = (page - 1) * limit
         
         # Get completed jobs sorted by creation date (newest first)
-        jobs = await database.video_jobs.find(query)\
+        jobs = await database.video_jobs.find(query, {field: 0 for field in JOB_ARTIFACT_FIELDS})\
             .sort("created_at", -1)\
             .skip(skip)\
             .limit(limit)\
@@ -546,7 +555,7 @@ async def download_transcript(job_id: str, format: str = Query("json", regex="^(
                 detail=f"Job is not completed (status: {job.get('status')})"
             )
         
-        transcript = job.get("transcript", [])
+        transcript = (await _get_job_artifacts(database, job, "transcript"))["transcript"] or []
         if not transcript:
             raise HTTPException(status_code=404, detail="Transcript not found for this job")
         
@@ -635,6 +644,23 @@ async def download_audio(job_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to download audio: {str(e)}")
 
 
+async def _get_job_artifacts(database, job: Dict, *fields: str) -> Dict:
+    """Load large job fields from job_artifacts, falling back to the job document (older jobs)"""
+    projection = {}
+    for field in fields:
+        projection[field] = 1
+        projection[f"{field}_z"] = 1  # Compressed form (COMPRESSED_ARTIFACT_FIELDS)
+    artifacts = await database.job_artifacts.find_one({"_id": job["_id"]}, projection) or {}
+    
+    result = {}
+    for field in fields:
+        if f"{field}_z" in artifacts:
+            result[field] = unpack(artifacts[f"{field}_z"])
+        else:
+            result[field] = artifacts.get(field, job.get(field))
+    return result
+
+
 def _format_timestamp(seconds: float) -> str:
     """Format seconds to HH:MM:SS"""
     hours = int(seconds // 3600)
@@ -677,9 +703,10 @@ async def chat_with_video(job_id: str, chat_request: ChatRequest):
         
         # Prepare context from transcript and report
         transcript_text = ""
-        if job.get("transcript"):
+        transcript = (await _get_job_artifacts(database, job, "transcript"))["transcript"]
+        if transcript:
             transcript_segments = []
-            for segment in job["transcript"]:
+            for segment in transcript:
                 timestamp = _format_timestamp(segment.get("start_time", 0))
                 text = segment.get("text", "")
                 speaker = segment.get("speaker", "")
@@ -768,9 +795,8 @@ USER QUESTION:
 
 Please provide a helpful, accurate response based on the video content above. Include relevant timestamps and quotes when applicable."""
 
-        # Use Gemini to generate response
-        gemini_service = GeminiService()
-        response = gemini_service.text_model.generate_content(prompt)
+        # Use Gemini to generate response (shared service/client; blocking call kept off the loop)
+        response = await asyncio.to_thread(gemini_service.text_model.generate_content, prompt)
         
         return {
             "response": response.text,
@@ -2,7 +2,7 @@ import io
 import os
 import time
 import random
-from typing import Optional, BinaryIO
+from typing import Optional, BinaryIO, List
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
@@ -15,6 +15,27 @@ import config
 
 import threading
 
+RESUMABLE_UPLOAD_THRESHOLD = 5 * 1024 * 1024  # bytes
+# Resumable uploads read one chunk into memory at a time (library default is 100MB)
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024  # bytes, must be a multiple of 256KB
+
+
+class _TeeWriter:
+    """File-like target that also mirrors every chunk to a second stream (e.g. ffmpeg stdin)"""
+    def __init__(self, f: BinaryIO, mirror: Optional[BinaryIO]):
+        self.f = f
+        self.mirror = mirror
+    
+    def write(self, data: bytes) -> int:
+        if self.mirror is not None:
+            try:
+                self.mirror.write(data)
+            except (OSError, ValueError):
+                # Consumer went away (e.g. unstreamable container); keep saving the file
+                self.mirror = None
+        return self.f.write(data)
+
+
 class GoogleDriveService:
     def __init__(self):
         self.creds = None
@@ -67,8 +88,13 @@ class GoogleDriveService:
             # Assume it's already a file ID
             return drive_url
     
-    def download_file(self, file_id: str, destination_path: str) -> str:
-        """Download file from Google Drive"""
+    def download_file(
+        self,
+        file_id: str,
+        destination_path: str,
+        mirror: Optional[BinaryIO] = None
+    ) -> str:
+        """Download file from Google Drive, optionally streaming the bytes to `mirror` as well"""
         try:
             request = self.service.files().get_media(
                 fileId=file_id,
@@ -76,7 +102,7 @@ class GoogleDriveService:
             )
             
             with open(destination_path, 'wb') as f:
-                downloader = MediaIoBaseDownload(f, request)
+                downloader = MediaIoBaseDownload(_TeeWriter(f, mirror), request)
                 done = False
                 while not done:
                     status, done = downloader.next_chunk()
@@ -129,13 +155,30 @@ class GoogleDriveService:
         except HttpError as error:
             raise Exception(f"Failed to create folder: {error}")
     
+    def generate_ids(self, count: int) -> List[str]:
+        """Reserve file IDs up front (one request) so uploads can be retried idempotently"""
+        ids = []
+        while len(ids) < count:
+            batch = min(count - len(ids), 1000)  # API maximum per call
+            response = self.service.files().generateIds(count=batch, space='drive').execute()
+            ids.extend(response.get('ids', []))
+        return ids
+    
     def upload_file(
         self, 
         file_path: str, 
         folder_id: Optional[str] = None,
-        file_name: Optional[str] = None
+        file_name: Optional[str] = None,
+        file_id: Optional[str] = None,
+        set_permission: bool = True
     ) -> dict:
-        """Upload file to Google Drive with retry logic"""
+        """
+        Upload file to Google Drive with retry logic.
+        
+        With a pre-generated file_id a retry after a lost response returns the
+        already-created file instead of uploading a duplicate. Pass
+        set_permission=False when permissions are granted in bulk via set_file_permissions.
+        """
         # Basic rate limiting
         time.sleep(0.5)
         
@@ -145,13 +188,21 @@ class GoogleDriveService:
         file_metadata = {'name': file_name}
         if folder_id:
             file_metadata['parents'] = [folder_id]
+        if file_id:
+            file_metadata['id'] = file_id
             
         max_retries = 5
         base_delay = 1
         
         for attempt in range(max_retries):
             try:
-                media = MediaFileUpload(file_path, resumable=True)
+                # Small files (frames, thumbnails) go up in a single multipart request;
+                # resumable sessions cost an extra round-trip and only pay off for large files
+                media = MediaFileUpload(
+                    file_path,
+                    chunksize=RESUMABLE_CHUNK_SIZE,
+                    resumable=os.path.getsize(file_path) > RESUMABLE_UPLOAD_THRESHOLD
+                )
                 file = self.service.files().create(
                     body=file_metadata,
                     media_body=media,
@@ -159,11 +210,22 @@ class GoogleDriveService:
                 ).execute()
                 
                 # Make file accessible
-                self._set_file_permission(file.get('id', ''))
+                if set_permission:
+                    self._set_file_permission(file.get('id', ''))
                 
                 return file
                 
             except Exception as e:
+                if file_id and isinstance(e, HttpError) and e.resp.status == 409:
+                    # An earlier attempt already created this ID; return it instead of a duplicate
+                    file = self.service.files().get(
+                        fileId=file_id,
+                        fields='id, name, webViewLink, webContentLink'
+                    ).execute()
+                    if set_permission:
+                        self._set_file_permission(file_id)
+                    return file
+                
                 # Catch both HttpError and network errors (like WinError 10054)
                 if attempt == max_retries - 1:
                     print(f"Failed to upload {file_name} after {max_retries} attempts. Last error: {e}")
@@ -195,6 +257,27 @@ class GoogleDriveService:
         except Exception as error:
             print(f"Warning: Failed to set permission: {error}")
     
+    def set_file_permissions(self, file_ids: List[str]):
+        """Grant the same access as _set_file_permission to many files in batched requests"""
+        permission = {
+            'type': 'anyone',
+            'role': 'reader'
+        }
+        
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                print(f"Warning: Failed to set permission: {exception}")
+        
+        # The batch endpoint accepts at most 100 calls per request
+        for start in range(0, len(file_ids), 100):
+            batch = self.service.new_batch_http_request(callback=on_response)
+            for file_id in file_ids[start:start + 100]:
+                batch.add(self.service.permissions().create(fileId=file_id, body=permission))
+            try:
+                batch.execute()
+            except Exception as error:
+                print(f"Warning: Batch permission request failed: {error}")
+    
     def get_file_url(self, file_id: str) -> str:
         """Get shareable URL for file"""
         return f"https://drive.google.com/file/d/{file_id}/view"
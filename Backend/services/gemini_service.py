@@ -1,19 +1,34 @@
 import os
 import json
-import time
 import re
+import random
 import asyncio
+import bisect
+import functools
 from typing import List, Dict, Any, Optional
 import google.generativeai as genai
-from PIL import Image
 import config
 from models.video_job import TranscriptSegment, Topic, Frame
 
+# orjson serializes prompt payloads several times faster than the stdlib;
+# fall back to json if it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure Gemini
 genai.configure(api_key=config.GEMINI_API_KEY)
 
 def timestamp_to_seconds(timestamp_str: str) -> float:
     """Convert HH:MM:SS format to seconds"""
+    if isinstance(timestamp_str, str):
+        return _parse_timestamp(timestamp_str)
+    return _parse_timestamp.__wrapped__(timestamp_str)  # unhashable/odd LLM values skip the cache
+
+# The same handful of timestamps (topic bounds, frame times) are parsed over and over
+@functools.lru_cache(maxsize=4096)
+def _parse_timestamp(timestamp_str: str) -> float:
     try:
         parts = timestamp_str.strip().split(':')
         if len(parts) == 3:
@@ -34,17 +49,257 @@ def seconds_to_timestamp(seconds: float) -> str:
     secs = int(seconds % 60)
     return f"{hours:02d}:{minutes:02d}:{secs:02d}"
 
-def retry_with_backoff(func, max_retries=3, initial_delay=2):
-    """Retry a function with exponential backoff"""
+def _coerce_index(value: Any, size: int) -> Optional[int]:
+    """Coerce an LLM-returned list index to a valid int in [0, size), else None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value.lstrip('-').isdigit():
+            return None
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if not isinstance(value, int) or not 0 <= value < size:
+        return None
+    return value
+
+def _image_part(path: str) -> Dict[str, Any]:
+    """
+    Load an image file as an inline Gemini content part.
+    Frames are already JPEG-encoded by ffmpeg, so the bytes are sent as-is
+    instead of being decoded into a PIL image and re-encoded by the client.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:2] == b"\xff\xd8":
+        mime_type = "image/jpeg"
+    elif data[:8] == b"\x89PNG\r\n\x1a\n":
+        mime_type = "image/png"
+    else:
+        raise ValueError(f"Unsupported image format: {path}")
+    return {"mime_type": mime_type, "data": data}
+
+# Gemini rejects requests over 20MB; keep inline audio (plus base64 overhead) well below that
+_INLINE_AUDIO_LIMIT = 12 * 1024 * 1024
+
+def _audio_part(path: str, mime_type: str = "audio/wav"):
+    """
+    Audio chunk as a Gemini content part. Chunks that fit are sent inline, read in a
+    with-block so the file handle is closed before returning (the File API upload keeps
+    its handle open until garbage collection, which blocks deleting the chunk on Windows).
+    Larger files fall back to the File API.
+    """
+    if os.path.getsize(path) <= _INLINE_AUDIO_LIMIT:
+        with open(path, "rb") as f:
+            return {"mime_type": mime_type, "data": f.read()}
+    return genai.upload_file(path=path, mime_type=mime_type)
+
+def _release_part(part):
+    """Delete a File API upload created by _audio_part (inline parts need nothing)"""
+    if isinstance(part, dict):
+        return
+    try:
+        genai.delete_file(part.name)
+    except Exception as e:
+        print(f"Warning: Could not delete uploaded file {part.name}: {e}")
+
+def _dumps_indented(obj: Any) -> str:
+    """Serialize obj as 2-space indented JSON for prompt embedding"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+def _format_topic_brief(index: int, topic: Dict) -> str:
+    """One-line topic summary for the synthesis prompt"""
+    ts_range = topic.get("timestamp_range") or ["?", "?"]
+    start = ts_range[0] if len(ts_range) > 0 else "?"
+    end = ts_range[1] if len(ts_range) > 1 else "?"
+    summary = (topic.get("summary") or "")[:160]
+    key_points = topic.get("key_points") or []
+    points = "; ".join(str(p)[:80] for p in key_points[:4])
+    if len(key_points) > 4:
+        points += f"; +{len(key_points) - 4} more"
+    return (f"- T{index}: {topic.get('title', 'Untitled')} | {start}-{end} | "
+            f"{summary} | key_points: {points or 'none'}")
+
+def _format_frame_brief(frame: Dict) -> str:
+    """One-line frame summary for the synthesis prompt"""
+    ts = frame.get("timestamp", "?")
+    if isinstance(ts, (int, float)):
+        ts = seconds_to_timestamp(ts)
+    description = (frame.get("description") or "")[:120]
+    return f"- {frame.get('type', 'other')} @ {ts}: {description}"
+
+def _first_json_object(text: str) -> Optional[str]:
+    """
+    Return the first complete top-level {...} object in text, or None.
+    Single pass that tracks string/escape state so braces inside string
+    values don't affect the depth count.
+    """
+    start = text.find('{')
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+async def retry_with_backoff(func, max_retries=3, initial_delay=2, max_delay=30):
+    """
+    Run a blocking function in a worker thread, retrying with backoff.
+    Waits between attempts use asyncio.sleep so no thread is held while backing
+    off, and decorrelated jitter keeps concurrent callers from retrying in lockstep
+    after a shared 429.
+    """
+    delay = initial_delay
     for attempt in range(max_retries):
         try:
-            return func()
+            return await asyncio.to_thread(func)
         except Exception as e:
             if attempt == max_retries - 1:
                 raise
-            delay = initial_delay * (2 ** attempt)
-            print(f"Retry {attempt + 1}/{max_retries} after {delay}s due to: {str(e)[:100]}")
-            time.sleep(delay)
+            delay = min(max_delay, random.uniform(initial_delay, delay * 3))
+            print(f"Retry {attempt + 1}/{max_retries} after {delay:.1f}s due to: {str(e)[:100]}")
+            await asyncio.sleep(delay)
+
+
+# Static prompt templates. Only the {placeholders} change between calls, so the
+# fixed instructions are built once at import instead of on every request.
+_FRAME_BATCH_PROMPT = """
+Analyze these video frames and for each frame provide:
+1. Semantic description (what's shown - slides, diagrams, people, demos, etc.)
+2. OCR: Extract all visible text
+3. Type: Classify as "slide", "diagram", "chart", "demo", "person", "other"
+4. Key insights: What information does this frame convey?
+
+{context_text}
+
+Return analysis in this JSON format (avoid trailing commas):
+{{
+    "frames": [
+        {{
+            "frame_index": 0,
+            "description": "Slide showing framework diagram",
+            "ocr_text": "extracted text here",
+            "type": "slide",
+            "insights": "Key concepts being presented"
+        }}
+    ]
+}}
+"""
+
+_CLUSTER_PROMPT = """
+I am providing you with {n} frames captured within a processing window from {start_ts} to {end_ts}. These likely represent the same slide or visual element, potentially with slight animations or cursor movements.
+
+Task 1: Select the "Hero Frame". This is the frame that is most focused, least blurry, and contains the most complete information (e.g., the full list is revealed, or the slide build is complete).
+Task 2: Extract the title or main heading from that frame.
+Task 3: Summarize the specific data or concept shown in that frame (do not summarize the audio, only what is VISIBLE).
+
+Return JSON:
+{{
+  "hero_frame_index": 0, // The index of the selected best image (0 to {max_idx})
+  "sub_topic_title": "Slide Title",
+  "visual_summary": "Description of the visual content (chart trends, code purpose, diagram flow)",
+  "ocr_keywords": ["keyword1", "keyword2"]
+}}
+"""
+
+_MAP_TOPICS_PROMPT = """
+You are a Report Structuring Engine. I have a list of "Main Topics" derived from the audio transcript, and a list of "Visual Sub-Topics" derived from analyzing screenshots.
+
+Your task is to nest the Visual Sub-Topics under the correct Main Topic based on their timestamps.
+
+Rules:
+1. A Visual Sub-Topic belongs to a Main Topic if its timestamp falls within the Main Topic's start/end range.
+2. If a Main Topic has more than 3 visual sub-topics, select the 3 most distinct ones based on their titles and summaries to avoid repetition.
+3. If a visual doesn't fit any main topic perfectly, fit it to the nearest logical topic.
+4. CRITICAL: If a Visual Sub-Topic is clearly an advertisement, sponsorship, or unrelated promotion (e.g. brand logos, 'buy now', 'subscribe'), DISCARD IT. Do not map it to any topic.
+
+Input Data:
+Main Topics: {main_topics_json}
+Visual Sub-Topics: {visuals_json}
+
+Return the Final JSON Structure:
+{{
+  "topics": [
+    {{
+      "title": "Main Topic Title", 
+      "sub_topics": [
+        {{
+          "title": "Visual Sub-Topic Title", 
+          "visual_summary": "Summary...", 
+          "timestamp": "HH:MM:SS",
+          "original_index": 0 
+        }}
+      ]
+    }}
+  ]
+}}
+"""
+
+_SYNTHESIS_PROMPT = """
+You are synthesizing analysis of a {duration_min:.1f}-minute video (duration: {duration_ts}).
+
+IMPORTANT: You must preserve ALL topics from the transcript analysis. Do not filter, remove, or skip any topics. 
+All topics should cover the full video duration from 00:00:00 to {duration_ts}.
+
+{playlist_context}
+
+{genre_snippet}
+
+Transcript Topics ({topic_count} total - preserve ALL of them):
+{topics_preview}
+
+Key Frames ({frame_count} total):
+{frames_preview}
+
+Your task:
+1. Generate an executive summary (3-5 sentences) covering the ENTIRE video
+2. PRESERVE ALL topics from transcript analysis - do not filter or remove any
+3. Ensure topics span the full video duration (00:00:00 to {duration_ts})
+4. Extract actionable insights and key takeaways
+5. List entities mentioned (companies, concepts, tools)
+
+Return ONLY valid JSON (no trailing commas or newlines in strings):
+{{
+    "executive_summary": "Clear summary covering the entire video...",
+    "topics": [
+        {{
+            "title": "Topic title",
+            "timestamp_range": ["00:00:00", "00:15:30"],
+            "summary": "Single line summary",
+            "key_points": ["point 1", "point 2"]
+        }}
+    ],
+    "key_takeaways": ["takeaway 1", "takeaway 2"],
+    "entities": {{
+        "companies": ["name1"],
+        "concepts": ["concept1"],
+        "tools": ["tool1"]
+    }}
+}}
+
+CRITICAL: Include ALL {topic_count} topics in your response. Topics must cover from 00:00:00 to {duration_ts}.
+"""
 
 
 class GeminiService:
@@ -212,9 +467,11 @@ class GeminiService:
         self,
         transcript_text: str,
         duration: float,
+        failures: Optional[List[str]] = None,
     ) -> Dict[str, Any]:
         """
         Classify video genre based on transcript (fast, small prompt).
+        If given, `failures` is appended to when the "unknown" fallback is returned.
 
         Returns:
             { "genre": str, "confidence": float, "reason": str }
@@ -264,22 +521,26 @@ Return ONLY valid JSON:
             return {"genre": genre, "confidence": float(confidence), "reason": reason}
 
         try:
-            return await asyncio.to_thread(retry_with_backoff, _classify, 2, 1) or {
+            return await retry_with_backoff(_classify, 2, 1) or {
                 "genre": "unknown",
                 "confidence": 0.0,
                 "reason": "",
             }
         except Exception as e:
             print(f"Genre classification failed: {e}")
+            if failures is not None:
+                failures.append("genre")
             return {"genre": "unknown", "confidence": 0.0, "reason": ""}
 
     async def detect_transcript_visual_cues(
         self,
-        transcript_segments: List[TranscriptSegment]
+        transcript_segments: List[TranscriptSegment],
+        failures: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
         """
         Phase 1: The "Audio Cue" Scout
         Identifies timestamps where speaker references visuals.
+        If given, `failures` is appended to when the empty fallback is returned.
         """
         if not transcript_segments:
             return []
@@ -330,9 +591,11 @@ If no cues are found, return an empty list.
             return result.get("visual_cues", []) if result else []
 
         try:
-            return await asyncio.to_thread(retry_with_backoff, _scout, 2)
+            return await retry_with_backoff(_scout, 2)
         except Exception as e:
             print(f"Audio Cue Scout failed: {e}")
+            if failures is not None:
+                failures.append("audio_cues")
             return []
 
     async def evaluate_frame_content(
@@ -344,7 +607,7 @@ If no cues are found, return an empty list.
         Classify frame as Slide/Demo/Diagram (Useful) or Person/Other (Junk).
         """
         def _gatekeep():
-            img = Image.open(frame_path)
+            img = _image_part(frame_path)
             
             prompt = """
 Analyze this video frame. Your goal is to determine if this frame contains valuable static information (like a presentation slide, coding terminal, or data dashboard) or if it is generic footage (like a person talking or a transition).
@@ -369,8 +632,9 @@ Return JSON:
             result = self._parse_json_response(response.text)
             
             if not result:
+                # Unparseable reply: not a verdict on the frame, so it must not be cached as one
                 return {
-                    "category": "other",
+                    "category": "error",
                     "information_density": "none",
                     "contains_text": False,
                     "is_useful": False
@@ -378,7 +642,7 @@ Return JSON:
             return result
 
         try:
-            return await asyncio.to_thread(retry_with_backoff, _gatekeep, 2)
+            return await retry_with_backoff(_gatekeep, 2)
         except Exception as e:
             print(f"Gatekeeper analysis failed for {frame_path}: {e}")
             return {
@@ -391,7 +655,8 @@ Return JSON:
     async def transcribe_audio(
         self, 
         audio_path: str,
-        start_time: float = 0
+        start_time: float = 0,
+        failures: Optional[List[str]] = None
     ) -> List[TranscriptSegment]:
         """
         Transcribe audio using Gemini with retry logic
@@ -399,19 +664,14 @@ Return JSON:
         Args:
             audio_path: Path to audio file
             start_time: Start time offset for this chunk
+            failures: Optional list appended to when the untimed fallback is used
         
         Returns:
             List of transcript segments
         """
         def _transcribe():
-            # Upload audio file
-            print(f"Uploading audio chunk starting at {start_time}s...")
-            
-            # Use the correct API for google-generativeai >= 0.4.0
-            audio_file = genai.upload_file(
-                path=audio_path,
-                mime_type="audio/wav"
-            )
+            print(f"Preparing audio chunk starting at {start_time}s...")
+            audio_file = _audio_part(audio_path)
             
             prompt = """
             Transcribe this audio with speaker diarization. 
@@ -433,7 +693,10 @@ Return JSON:
             """
             
             print("Sending to Gemini for transcription...")
-            response = self.text_model.generate_content([prompt, audio_file])
+            try:
+                response = self.text_model.generate_content([prompt, audio_file])
+            finally:
+                _release_part(audio_file)
             
             # Parse response
             result = self._parse_json_response(response.text)
@@ -452,9 +715,11 @@ Return JSON:
             return segments
         
         try:
-            return await asyncio.to_thread(retry_with_backoff, _transcribe, 3)
+            return await retry_with_backoff(_transcribe, 3)
         except Exception as e:
             print(f"Error transcribing audio after retries: {e}")
+            if failures is not None:
+                failures.append(f"transcribe:{audio_path}")
             # Fallback: simple transcription without timestamps
             return await self._simple_transcribe(audio_path, start_time)
     
@@ -465,10 +730,13 @@ Return JSON:
     ) -> List[TranscriptSegment]:
         """Fallback simple transcription"""
         try:
-            audio_file = genai.upload_file(audio_path)
+            audio_file = _audio_part(audio_path)
             prompt = "Transcribe this audio verbatim. Identify different speakers if possible."
             
-            response = self.text_model.generate_content([prompt, audio_file])
+            try:
+                response = self.text_model.generate_content([prompt, audio_file])
+            finally:
+                _release_part(audio_file)
             
             return [TranscriptSegment(
                 text=response.text,
@@ -678,7 +946,7 @@ Return JSON:
             return result or {}
         
         try:
-            return await asyncio.to_thread(retry_with_backoff, _analyze, 3)
+            return await retry_with_backoff(_analyze, 3)
         except Exception as e:
             print(f"Error analyzing transcript after retries: {e}")
             return {}
@@ -729,35 +997,10 @@ Return JSON:
     ) -> List[Dict[str, Any]]:
         """Analyze a batch of frames together with retry logic"""
         def _analyze():
-            images = []
-            for path in frame_paths:
-                img = Image.open(path)
-                images.append(img)
+            images = [_image_part(path) for path in frame_paths]
             
             context_text = f"\nContext: {context}" if context else ""
-            
-            prompt = f"""
-        Analyze these video frames and for each frame provide:
-        1. Semantic description (what's shown - slides, diagrams, people, demos, etc.)
-        2. OCR: Extract all visible text
-        3. Type: Classify as "slide", "diagram", "chart", "demo", "person", "other"
-        4. Key insights: What information does this frame convey?
-        
-        {context_text}
-        
-        Return analysis in this JSON format (avoid trailing commas):
-        {{
-            "frames": [
-                {{
-                    "frame_index": 0,
-                    "description": "Slide showing framework diagram",
-                    "ocr_text": "extracted text here",
-                    "type": "slide",
-                    "insights": "Key concepts being presented"
-                }}
-            ]
-        }}
-        """
+            prompt = _FRAME_BATCH_PROMPT.format(context_text=context_text)
             
             content = [prompt] + images
             print(f"Analyzing batch of {len(images)} frames...")
@@ -780,7 +1023,7 @@ Return JSON:
             return analyses
         
         try:
-            return await asyncio.to_thread(retry_with_backoff, _analyze, 3)
+            return await retry_with_backoff(_analyze, 3)
         except Exception as e:
             print(f"Error analyzing frame batch after retries: {e}")
             # Return placeholder results
@@ -819,12 +1062,9 @@ Return JSON:
                 
                 for idx, path in enumerate(frame_paths):
                     try:
-                        img = Image.open(path)
-                        if img.mode != 'RGB':
-                            img = img.convert('RGB')
-                        image_parts.append(img)
+                        image_parts.append(_image_part(path))
                         valid_candidates.append(candidates[idx])
-                    except:
+                    except (OSError, ValueError):
                         continue
                 
                 if not image_parts:
@@ -834,21 +1074,12 @@ Return JSON:
                 start_ts = seconds_to_timestamp(cluster.get('start_time', 0))
                 end_ts = seconds_to_timestamp(cluster.get('end_time', 0))
                     
-                prompt = f"""
-                I am providing you with {len(image_parts)} frames captured within a processing window from {start_ts} to {end_ts}. These likely represent the same slide or visual element, potentially with slight animations or cursor movements.
-                
-                Task 1: Select the "Hero Frame". This is the frame that is most focused, least blurry, and contains the most complete information (e.g., the full list is revealed, or the slide build is complete).
-                Task 2: Extract the title or main heading from that frame.
-                Task 3: Summarize the specific data or concept shown in that frame (do not summarize the audio, only what is VISIBLE).
-
-                Return JSON:
-                {{
-                  "hero_frame_index": 0, // The index of the selected best image (0 to {len(image_parts)-1})
-                  "sub_topic_title": "Slide Title",
-                  "visual_summary": "Description of the visual content (chart trends, code purpose, diagram flow)",
-                  "ocr_keywords": ["keyword1", "keyword2"]
-                }}
-                """
+                prompt = _CLUSTER_PROMPT.format(
+                    n=len(image_parts),
+                    start_ts=start_ts,
+                    end_ts=end_ts,
+                    max_idx=len(image_parts) - 1
+                )
                 
                 def _do_vision():
                     content = [prompt] + image_parts
@@ -856,8 +1087,8 @@ Return JSON:
                     return self._parse_json_response(response.text)
 
                 try:
-                    # Use thread for blocking retry/vision call
-                    parsed = await asyncio.to_thread(retry_with_backoff, _do_vision, 2, 1)
+                    # Vision call runs in a worker thread; backoff waits stay on the event loop
+                    parsed = await retry_with_backoff(_do_vision, 2, 1)
                     
                     if parsed:
                         idx = parsed.get("hero_frame_index", 0)
@@ -909,52 +1140,27 @@ Return JSON:
             "timestamp_range": t.get("timestamp_range")
         } for t in main_topics]
         
+        # Format each visual's timestamp once; reused by the prompt and the merge step
+        visual_ts_strs = [seconds_to_timestamp(v.get("timestamp", 0)) for v in visual_subtopics]
+        
         simple_visuals = [{
             "title": v.get("sub_topic_title"),
             "visual_summary": v.get("visual_summary"),
-            "timestamp": seconds_to_timestamp(v.get("timestamp", 0)),
+            "timestamp": visual_ts_strs[i],
             "original_index": i
         } for i, v in enumerate(visual_subtopics)]
         
-        prompt = f"""
-        You are a Report Structuring Engine. I have a list of "Main Topics" derived from the audio transcript, and a list of "Visual Sub-Topics" derived from analyzing screenshots.
-
-        Your task is to nest the Visual Sub-Topics under the correct Main Topic based on their timestamps.
-
-        Rules:
-        1. A Visual Sub-Topic belongs to a Main Topic if its timestamp falls within the Main Topic's start/end range.
-        2. If a Main Topic has more than 3 visual sub-topics, select the 3 most distinct ones based on their titles and summaries to avoid repetition.
-        3. If a visual doesn't fit any main topic perfectly, fit it to the nearest logical topic.
-        4. CRITICAL: If a Visual Sub-Topic is clearly an advertisement, sponsorship, or unrelated promotion (e.g. brand logos, 'buy now', 'subscribe'), DISCARD IT. Do not map it to any topic.
-
-        Input Data:
-        Main Topics: {json.dumps(simple_main_topics, indent=2)}
-        Visual Sub-Topics: {json.dumps(simple_visuals, indent=2)}
-
-        Return the Final JSON Structure:
-        {{
-          "topics": [
-            {{
-              "title": "Main Topic Title", 
-              "sub_topics": [
-                {{
-                  "title": "Visual Sub-Topic Title", 
-                  "visual_summary": "Summary...", 
-                  "timestamp": "HH:MM:SS",
-                  "original_index": 0 
-                }}
-              ]
-            }}
-          ]
-        }}
-        """
+        prompt = _MAP_TOPICS_PROMPT.format(
+            main_topics_json=_dumps_indented(simple_main_topics),
+            visuals_json=_dumps_indented(simple_visuals)
+        )
         
         def _map_topics():
             response = self.text_model.generate_content(prompt)
             return self._parse_json_response(response.text)
             
         try:
-            mapped_result = await asyncio.to_thread(retry_with_backoff, _map_topics, 2)
+            mapped_result = await retry_with_backoff(_map_topics, 2)
             
             if mapped_result and "topics" in mapped_result:
                 # Merge logic
@@ -967,23 +1173,25 @@ Return JSON:
                 
                 # Create lookup for result topics
                 result_topic_map = {t.get("title"): t for t in mapped_result["topics"]}
+                num_visuals = len(visual_subtopics)
                 
                 for topic in final_topics:
                     mapped = result_topic_map.get(topic.get("title"))
                     if mapped:
                         sub_topics_data = []
                         for sub in mapped.get("sub_topics", []):
-                            idx = sub.get("original_index")
-                            if idx is not None and 0 <= idx < len(visual_subtopics):
-                                # Get full visual data
-                                visual = visual_subtopics[idx]
-                                sub_topics_data.append({
-                                    "title": sub.get("title", visual.get("sub_topic_title")),
-                                    "visual_summary": sub.get("visual_summary", visual.get("visual_summary")),
-                                    "timestamp": sub.get("timestamp", seconds_to_timestamp(visual.get("timestamp", 0))),
-                                    "image_url": None, # Will be filled by pipeline using frame_path map
-                                    "frame_timestamp": visual.get("timestamp", 0) # Keep seconds for linking
-                                })
+                            idx = _coerce_index(sub.get("original_index"), num_visuals)
+                            if idx is None:
+                                continue
+                            # Get full visual data
+                            visual = visual_subtopics[idx]
+                            sub_topics_data.append({
+                                "title": sub.get("title", visual.get("sub_topic_title")),
+                                "visual_summary": sub.get("visual_summary", visual.get("visual_summary")),
+                                "timestamp": sub.get("timestamp", visual_ts_strs[idx]),
+                                "image_url": None, # Will be filled by pipeline using frame_path map
+                                "frame_timestamp": visual.get("timestamp", 0) # Keep seconds for linking
+                            })
                         topic["sub_topics"] = sub_topics_data
                     else:
                         topic["sub_topics"] = []
@@ -1002,28 +1210,28 @@ Return JSON:
         import copy
         final_topics = copy.deepcopy(main_topics)
         
+        # Sort visuals by timestamp once so each topic can slice its range with bisect
+        sorted_visuals = sorted(visual_subtopics, key=lambda v: v.get("timestamp", 0))
+        sorted_times = [v.get("timestamp", 0) for v in sorted_visuals]
+        
         for topic in final_topics:
-            topic["sub_topics"] = []
-            
             ts_start = topic.get("timestamp_range", ["00:00:00"])[0]
             ts_end = topic.get("timestamp_range", ["00:00:00", "23:59:59"])[1]
             
             start_time = timestamp_to_seconds(ts_start)
             end_time = timestamp_to_seconds(ts_end)
             
-            for v in visual_subtopics:
-                ts = v.get("timestamp", 0)
-                if start_time <= ts <= end_time:
-                     topic["sub_topics"].append({
-                        "title": v.get("sub_topic_title"),
-                        "visual_summary": v.get("visual_summary"),
-                        "timestamp": seconds_to_timestamp(ts),
-                        "frame_timestamp": ts,
-                        "image_url": None
-                    })
+            lo = bisect.bisect_left(sorted_times, start_time)
+            hi = bisect.bisect_right(sorted_times, end_time)
             
             # Limit to 3 per topic
-            topic["sub_topics"] = topic["sub_topics"][:3]
+            topic["sub_topics"] = [{
+                "title": v.get("sub_topic_title"),
+                "visual_summary": v.get("visual_summary"),
+                "timestamp": seconds_to_timestamp(v.get("timestamp", 0)),
+                "frame_timestamp": v.get("timestamp", 0),
+                "image_url": None
+            } for v in sorted_visuals[lo:min(hi, lo + 3)]]
             
         return final_topics
 
@@ -1053,55 +1261,23 @@ Return JSON:
             # Ensure topics cover full duration - if not, keep original topics from analysis
             topics_covering_full_duration = all_topics
             
-            # Create a compact version for synthesis summary generation
-            topics_preview = json.dumps(all_topics[:10])[:3000] if len(all_topics) > 10 else json.dumps(all_topics)[:3000]
-            frames_preview = json.dumps(frame_analyses[:15])[:3000] if len(frame_analyses) > 15 else json.dumps(frame_analyses)[:3000]
+            # One bounded line per topic/frame instead of raw JSON: every topic fits
+            # in the prompt and far fewer input tokens are spent on syntax
+            topics_preview = "\n".join(
+                _format_topic_brief(i, t) for i, t in enumerate(all_topics, 1)
+            )
+            frames_preview = "\n".join(_format_frame_brief(f) for f in frame_analyses)
             
-            genre_snippet = self._genre_snippet(video_genre, "synthesis")
-            prompt = f"""
-        You are synthesizing analysis of a {duration/60:.1f}-minute video (duration: {seconds_to_timestamp(duration)}).
-        
-        IMPORTANT: You must preserve ALL topics from the transcript analysis. Do not filter, remove, or skip any topics. 
-        All topics should cover the full video duration from 00:00:00 to {seconds_to_timestamp(duration)}.
-
-        {f'{playlist_context}' if playlist_context else ''}
-
-        {genre_snippet}
-        
-        Transcript Topics ({len(all_topics)} total - preserve ALL of them):
-        {topics_preview}
-        
-        Key Frames ({len(frame_analyses)} total):
-        {frames_preview}
-        
-        Your task:
-        1. Generate an executive summary (3-5 sentences) covering the ENTIRE video
-        2. PRESERVE ALL topics from transcript analysis - do not filter or remove any
-        3. Ensure topics span the full video duration (00:00:00 to {seconds_to_timestamp(duration)})
-        4. Extract actionable insights and key takeaways
-        5. List entities mentioned (companies, concepts, tools)
-        
-        Return ONLY valid JSON (no trailing commas or newlines in strings):
-        {{
-            "executive_summary": "Clear summary covering the entire video...",
-            "topics": [
-                {{
-                    "title": "Topic title",
-                    "timestamp_range": ["00:00:00", "00:15:30"],
-                    "summary": "Single line summary",
-                    "key_points": ["point 1", "point 2"]
-                }}
-            ],
-            "key_takeaways": ["takeaway 1", "takeaway 2"],
-            "entities": {{
-                "companies": ["name1"],
-                "concepts": ["concept1"],
-                "tools": ["tool1"]
-            }}
-        }}
-        
-        CRITICAL: Include ALL {len(all_topics)} topics in your response. Topics must cover from 00:00:00 to {seconds_to_timestamp(duration)}.
-        """
+            prompt = _SYNTHESIS_PROMPT.format(
+                duration_min=duration / 60,
+                duration_ts=seconds_to_timestamp(duration),
+                playlist_context=playlist_context or "",
+                genre_snippet=self._genre_snippet(video_genre, "synthesis"),
+                topic_count=len(all_topics),
+                topics_preview=topics_preview,
+                frame_count=len(frame_analyses),
+                frames_preview=frames_preview
+            )
             
             print(f"Synthesizing results with Gemini (preserving {len(all_topics)} topics)...")
             response = self.text_model.generate_content(prompt)
@@ -1113,6 +1289,18 @@ Return JSON:
                 print(f"Warning: Synthesis returned {len(synthesized_topics)} topics but original had {len(all_topics)}. Using original topics.")
                 synthesized_topics = all_topics
             
+            # The brief only carries a few truncated key points per topic, so when the
+            # synthesized topics line up one-to-one with the originals, keep the
+            # original key_points and timestamp_range instead of the model's rewrite
+            if synthesized_topics is not all_topics and len(synthesized_topics) == len(all_topics):
+                synthesized_topics = [
+                    {
+                        **topic,
+                        **{k: original[k] for k in ("key_points", "timestamp_range") if original.get(k)}
+                    }
+                    for topic, original in zip(synthesized_topics, all_topics)
+                ]
+            
             # Merge: use synthesized topics if they cover full duration, otherwise use original
             final_topics = synthesized_topics if synthesized_topics else all_topics
             
@@ -1124,7 +1312,7 @@ Return JSON:
             }
         
         try:
-            return await asyncio.to_thread(retry_with_backoff, _synthesize, 2)
+            return await retry_with_backoff(_synthesize, 2)
         except Exception as e:
             print(f"Error synthesizing results: {e}")
             # Return fallback with ALL original topics from analysis
@@ -1220,7 +1408,7 @@ Generate exactly 5 slides."""
             return self._parse_json_response(response.text)
         
         try:
-            result = await asyncio.to_thread(retry_with_backoff, _generate, 2)
+            result = await retry_with_backoff(_generate, 2)
             
             if result and "slides" in result:
                 slides = result["slides"][:5]  # Ensure max 5
@@ -1268,13 +1456,16 @@ Generate exactly 5 slides."""
             if match:
                 json_str = match.group(1)
             else:
-                # 2. Try to find the first '{' and last '}'
-                start = text.find('{')
-                end = text.rfind('}')
-                if start != -1 and end != -1:
-                    json_str = text[start:end+1]
-                else:
-                    json_str = text
+                # 2. Take the first complete top-level object
+                json_str = _first_json_object(text)
+                if json_str is None:
+                    # 3. Unbalanced output: fall back to the first '{' and last '}'
+                    start = text.find('{')
+                    end = text.rfind('}')
+                    if start != -1 and end != -1:
+                        json_str = text[start:end+1]
+                    else:
+                        json_str = text
 
             # 3. Clean and Parse
             try:
@@ -1,12 +1,23 @@
 import os
-import time
 import asyncio
+import bisect
+import hashlib
+import functools
+import shutil
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, Optional
 from bson import ObjectId
+from pymongo import UpdateOne
 
 from models.database import db
-from models.video_job import VideoJob, TranscriptSegment, Topic, Frame, SubTopic
+from models.video_job import (
+    VideoJob, TranscriptSegment, Topic, Frame, SubTopic,
+    JOB_ARTIFACT_FIELDS, COMPRESSED_ARTIFACT_FIELDS
+)
 from services.credit_service import credit_service
 from services.drive_service import drive_service
 from services.youtube_service import youtube_service
@@ -15,14 +26,30 @@ from services.gemini_service import gemini_service
 from utils.ffmpeg_utils import FFmpegUtils
 from utils.roi_utils import merge_time_windows
 from utils.image_processing import ImageProcessor
+from utils.credit_sem import transcribe_credits, vision_requests, vision_tokens, is_rate_limited
+from utils.compression import pack, unpack
 import config
 
+# Dedicated threads for Drive uploads; each keeps its thread-local Drive client
+# (and its keep-alive connection) across uploads instead of sharing the default pool
+_upload_pool = ThreadPoolExecutor(
+    max_workers=2 * config.MAX_CONCURRENT_UPLOADS,
+    thread_name_prefix="drive-upload"
+)
+# Queued job updates are written at the next phase boundary, or after this many
+# seconds at the latest so status polls still see progress during long phases
+_QUEUED_UPDATE_MAX_AGE = 2.0
+
 
 class ProcessingPipeline:
     """Orchestrates the video processing pipeline"""
     
     def __init__(self):
         self.ffmpeg = FFmpegUtils()
+        # Per-job field/log changes waiting for the next write (see _queue_update)
+        self._pending_updates: Dict[str, Dict[str, Any]] = {}
+        # Writes for one job go out one at a time, in order; a lock lives while a flush holds it
+        self._flush_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
     
     async def process_video(self, job_id: str, playlist_context: str = None):
         """
@@ -37,6 +64,7 @@ class ProcessingPipeline:
         6. Synthesize results
         7. Store in MongoDB and Drive
         """
+        frames_task = None
         try:
             # Get job from database
             job = await self._get_job(job_id)
@@ -61,14 +89,14 @@ class ProcessingPipeline:
             
             # Step 1: Download video based on source
             video_path = await self._download_video(job, video_source)
-            await self._update_job(job_id, {
+            self._queue_update(job_id, {
                 "progress": 0.1,
                 "message": "Video secured! Now preparing for detailed analysis..."
             })
             
             # Get video metadata
             duration = self.ffmpeg.get_video_duration(video_path)
-            await self._update_job(job_id, {"duration": duration})
+            self._queue_update(job_id, {"duration": duration})
             
             # === Credit Deduction (now that we know the actual duration) ===
             user_id = job.get("user_id")
@@ -90,12 +118,17 @@ class ProcessingPipeline:
                     })
                     return  # Stop pipeline — insufficient credits
                 credits_charged = cost
+                # Written right away: the refund on failure reads the charge back from the job
                 await self._update_job(job_id, {
                     "credits_charged": credits_charged,
                     "credit_rate": rate_label
                 })
                 print(f"Charged {credits_charged} credits to user {user_id} (rate: {rate_label})")
             
+            # Reuse transcript/genre/cues if this exact video was processed before
+            cache_key = await self._transcript_cache_key(job, video_source, video_path)
+            cached = await self._load_cached_transcript(cache_key)
+            
             # Step 2: Extract audio
             await self._update_job(job_id, {
                 "status": "extracting",
@@ -103,29 +136,37 @@ class ProcessingPipeline:
                 "message": "Extracting high-quality audio for transcription..."
             })
             audio_path = await self._extract_audio(video_path, job_id)
-            await self._update_job(job_id, {
+            
+            # Phase 1: Coarse Visual Sampling (every 30s) - safety net for visuals
+            # that are never mentioned in the audio. It only needs the video file,
+            # so it runs in the background while the transcript is produced.
+            frames_task = asyncio.create_task(
+                self._extract_frames(video_path, job_id, {}, interval=30)
+            )
+            self._queue_update(job_id, {
                 "progress": 0.25,
                 "message": "Audio ready. Starting AI transcription engine..."
             })
             
             # Step 3: Transcribe audio
-            await self._update_job(job_id, {
-                "status": "transcribing",
-                "progress": 0.3,
-                "message": "The AI is transcribing the audio and identifying speakers..."
-            })
-            transcript = await self._transcribe_audio(audio_path)
-            await self._update_job(job_id, {
-                "transcript": [seg.model_dump() for seg in transcript],
+            # Stages that fell back to placeholder output; such results are not cached
+            degraded = []
+            if cached:
+                print(f"Transcript cache hit for {cache_key}")
+                transcript, transcript_dicts = cached["transcript"], cached["transcript_dicts"]
+            else:
+                await self._update_job(job_id, {
+                    "status": "transcribing",
+                    "progress": 0.3,
+                    "message": "The AI is transcribing the audio and identifying speakers..."
+                })
+                transcript, transcript_dicts = await self._transcribe_audio(audio_path, degraded)
+            self._queue_update(job_id, {
+                "transcript": transcript_dicts,
                 "progress": 0.5,
                 "message": "Transcription complete. Detecting visual cues and landmarks..."
             })
-            
-            # NEW: Phase 1 - Audio Cue Scout
-            print("Running Audio Cue Scout...")
-            audio_cues = await gemini_service.detect_transcript_visual_cues(transcript)
-            print(f"Detected {len(audio_cues)} audio cues")
-            await self._update_job(job_id, {"audio_visual_cues": audio_cues})
+            await self._flush(job_id)
             
             # Step 4: Analyze transcript
             await self._update_job(job_id, {
@@ -134,13 +175,6 @@ class ProcessingPipeline:
                 "message": "Analyzing the transcript to identify key topics and segments..."
             })
             
-            # Build transcript with timestamp context for better analysis
-            transcript_segments_with_time = []
-            for seg in transcript:
-                start_ts = self.ffmpeg.format_timestamp(seg.start_time)
-                end_ts = self.ffmpeg.format_timestamp(seg.end_time)
-                transcript_segments_with_time.append(f"[{start_ts}-{end_ts}] {seg.text}")
-            
             transcript_text = " ".join([seg.text for seg in transcript])
             
             # Log transcript coverage for debugging
@@ -150,13 +184,28 @@ class ProcessingPipeline:
                 print(f"Transcript covers: {self.ffmpeg.format_timestamp(first_seg_time)} to {self.ffmpeg.format_timestamp(last_seg_time)} (video duration: {self.ffmpeg.format_timestamp(duration)})")
                 print(f"Total transcript segments: {len(transcript)}, Total characters: {len(transcript_text)}")
 
-            # Step 4a: Classify video genre (to adapt downstream prompting)
-            genre_info = await gemini_service.classify_video_genre(transcript_text, duration)
+            # NEW: Phase 1 - Audio Cue Scout, run alongside
+            # Step 4a: Classify video genre (to adapt downstream prompting).
+            # Both only need the finished transcript, so their Gemini calls overlap.
+            if cached:
+                audio_cues, genre_info = cached["audio_visual_cues"], cached["genre_info"]
+            else:
+                print("Running Audio Cue Scout and genre classification...")
+                audio_cues, genre_info = await asyncio.gather(
+                    gemini_service.detect_transcript_visual_cues(transcript, degraded),
+                    gemini_service.classify_video_genre(transcript_text, duration, degraded)
+                )
+                if degraded:
+                    print(f"Not caching transcript for {cache_key}: degraded stages {degraded}")
+                else:
+                    await self._store_cached_transcript(cache_key, transcript_dicts, audio_cues, genre_info)
+            print(f"Detected {len(audio_cues)} audio cues")
             video_genre = genre_info.get("genre", "unknown")
             genre_confidence = genre_info.get("confidence", 0.0)
             genre_reason = genre_info.get("reason", "")
             print(f"Detected genre: {video_genre} (confidence={genre_confidence})")
-            await self._update_job(job_id, {
+            self._queue_update(job_id, {
+                "audio_visual_cues": audio_cues,
                 "video_genre": video_genre,
                 "genre_confidence": genre_confidence,
                 "genre_reason": genre_reason,
@@ -179,71 +228,26 @@ class ProcessingPipeline:
                 print(f"Filtered out {len(original_topics) - len(filtered_topics)} ad/sponsorship topics.")
                 transcript_analysis["topics"] = filtered_topics
                 
-            await self._update_job(job_id, {
+            self._queue_update(job_id, {
                 "progress": 0.6,
                 "message": "Filtering transcript for relevance andremoving distractions..."
             })
             
             # Step 5: Extract frames
-            await self._update_job(job_id, {
+            self._queue_update(job_id, {
                 "progress": 0.65,
                 "message": "Scanning video frames to identify the most important visual moments..."
             })
-            # Phase 1: Coarse Visual Sampling (every 30s)
-            raw_frames = await self._extract_frames(video_path, job_id, transcript_analysis, interval=30)
-            
-            # NEW: Phase 1 - Visual Gatekeeper (parallel evaluation)
-            print(f"⚡ Running Visual Gatekeeper on {len(raw_frames)} frames in parallel...")
-            useful_frames = []
-            visual_rois = []
-            
-            # Semaphore to limit concurrent Gemini Vision calls (tuned in config.py)
-            gate_sem = asyncio.Semaphore(config.MAX_CONCURRENT_VISION_TASKS)
-            
-            async def evaluate_single_frame(index, frame_path, timestamp):
-                """Evaluate a single frame with concurrency control"""
-                async with gate_sem:
-                    evaluation = await gemini_service.evaluate_frame_content(frame_path)
-                    return index, frame_path, timestamp, evaluation
-            
-            # Launch all frame evaluations in parallel
-            gate_tasks = [
-                evaluate_single_frame(i, fp, ts)
-                for i, (fp, ts) in enumerate(raw_frames)
-            ]
-            gate_results = await asyncio.gather(*gate_tasks, return_exceptions=True)
+            await self._flush(job_id)
+            raw_frames = await frames_task
             
-            # Process results in original order
-            for result in sorted(gate_results, key=lambda x: x[0] if not isinstance(x, Exception) else float('inf')):
-                if isinstance(result, Exception):
-                    print(f"  Frame evaluation error: {result}")
-                    continue
-                    
-                i, frame_path, timestamp, evaluation = result
-                is_useful = evaluation.get("is_useful", False)
-                category = evaluation.get("category", "unknown")
-                
-                visual_rois.append({
-                    "timestamp": timestamp,
-                    "timestamp_str": self.ffmpeg.format_timestamp(timestamp),
-                    "frame_path": frame_path,
-                    "evaluation": evaluation
-                })
-                
-                if is_useful:
-                    useful_frames.append((frame_path, timestamp))
-                    print(f"  Frame {i} at {timestamp}s: KEPT ({category})")
-                else:
-                    print(f"  Frame {i} at {timestamp}s: DROPPED ({category})")
-            
-            print(f"Gatekeeper: Kept {len(useful_frames)}/{len(raw_frames)} frames")
-
-            
-            # NEW: Phase 2 - ROI Fusion & Dense Sampling
-            print("Merging ROIs for Phase 2 processing...")
+            # Phase 2: ROI windows from audio cues & Dense Sampling.
+            # Windows depend only on the transcript, so dense frames are extracted
+            # up front and go through the Gatekeeper together with the coarse frames.
+            print("Merging audio cues into processing windows...")
             processing_windows = merge_time_windows(
                 audio_cues, 
-                visual_rois, 
+                [], 
                 duration,
                 buffer_seconds=5.0, # 5s buffer around events
                 min_gap=5.0 # Merge if gaps < 5s
@@ -255,54 +259,90 @@ class ProcessingPipeline:
             dense_frames = []
             
             if processing_windows:
-                dense_frames = self.ffmpeg.extract_dense_frames(
+                dense_frames = await asyncio.to_thread(
+                    self.ffmpeg.extract_dense_frames,
                     video_path,
                     frames_dir,
                     processing_windows,
                     fps=1
                 )
                 print(f"Extracted {len(dense_frames)} additional dense frames.")
+            
+            # Combine coarse frames with dense frames
+            # Use a dictionary to de-duplicate by timestamp (rounded to nearest second)
+            combined_frames_map = {}
+            for path, ts in raw_frames:
+                combined_frames_map[int(ts)] = (path, ts)
+            for path, ts in dense_frames:
+                combined_frames_map[int(ts)] = (path, ts)
+            candidate_frames = sorted(combined_frames_map.values(), key=lambda x: x[1])
+            
+            # Group near-identical frames (strict threshold) so the Gatekeeper
+            # evaluates each distinct visual once via its sharpest frame
+            gate_clusters = await asyncio.to_thread(
+                ImageProcessor.cluster_frames, candidate_frames, 8
+            )
+            # Keep the hashes so the hero-frame clustering below doesn't recompute them
+            frame_hashes = {
+                f["path"]: f["hash"] for c in gate_clusters for f in c["frames"]
+            }
+            representatives = [
+                (c["candidates"][0]["path"], c["candidates"][0]["timestamp"])
+                for c in gate_clusters
+            ]
+            
+            # Talk-heavy or short videos: when the audio-cue windows already cover most
+            # of the timeline, the Gatekeeper can't narrow much down, so keep every visual
+            window_coverage = sum(end - start for start, end in processing_windows) / max(duration, 1)
+            if window_coverage > config.GATEKEEPER_SKIP_COVERAGE or duration < 120:
+                print(f"Skipping Visual Gatekeeper: audio windows cover {window_coverage:.0%} "
+                      f"of {duration:.0f}s; keeping all {len(representatives)} visuals")
+                visual_rois = []
+                useful_frames = [
+                    (f["path"], f["timestamp"]) for c in gate_clusters for f in c["frames"]
+                ]
+                kept_clusters = len(gate_clusters)
+            else:
+                # NEW: Phase 1 - Visual Gatekeeper (parallel evaluation)
+                print(f"⚡ Running Visual Gatekeeper on {len(representatives)} representative frames "
+                      f"(from {len(candidate_frames)} sampled) in parallel...")
+                visual_rois, useful_frames, kept_clusters = await self._run_gatekeeper(
+                    gate_clusters, representatives
+                )
+            
+            print(f"Gatekeeper: Kept {kept_clusters}/{len(representatives)} visuals ({len(useful_frames)} frames)")
 
-            await self._update_job(job_id, {
+            self._queue_update(job_id, {
                 "visual_rois": visual_rois,
-                "total_frames_extracted": len(raw_frames),
+                "total_frames_extracted": len(candidate_frames),
                 "useful_frames_count": len(useful_frames),
                 "processing_windows": processing_windows,
                 "dense_frames_count": len(dense_frames),
                 "progress": 0.7,
                 "message": "Visual landmarks detected. Deduplicating and selecting 'hero' frames..."
             })
-            
-            # Combine useful coarse frames with dense frames
-            # Use a dictionary to de-duplicate by timestamp (rounded to nearest second)
-            combined_frames_map = {}
-            
-            # Add coarse frames first
-            for path, ts in useful_frames:
-                combined_frames_map[int(ts)] = (path, ts)
-                
-            # Add/Overwrite with dense frames (prefer dense as they are fresher?)
-            # Actually, both are fine, but dense frames are 1fps in active regions.
-            for path, ts in dense_frames:
-                combined_frames_map[int(ts)] = (path, ts)
+            await self._flush(job_id)
             
             # Sorted list of unique frames
-            frames = sorted(combined_frames_map.values(), key=lambda x: x[1])
+            frames = sorted(useful_frames, key=lambda x: x[1])
             print(f"Total unique frames for visual processing: {len(frames)}")
 
             # Phase 3: Visual Intelligence (The "Clean Up")
             # Step 1: Visual Deduplication
             print(f"Clustering {len(frames)} frames to find unique visual topics...")
             # Threshold 12 is a reasonable starting point for 64-bit dHash (0-64 distance)
-            clusters = ImageProcessor.cluster_frames(frames, threshold=12)
+            clusters = await asyncio.to_thread(
+                ImageProcessor.cluster_frames, frames, 12, frame_hashes
+            )
             print(f"Found {len(clusters)} unique visual clusters/slides.")
             
-            await self._update_job(job_id, {
+            self._queue_update(job_id, {
                 "progress": 0.75,
                 "visual_clusters_count": len(clusters),
                 "visual_clusters_preview": [{"start": c["start_time"], "end": c["end_time"], "count": c["frame_count"]} for c in clusters[:10]],
                 "message": "Generating visual sub-topics and cross-referencing with audio..."
             })
+            await self._flush(job_id)
             
             # Step 2: Hero Frame Selector
             print(f"Selecting Hero Frames for {len(clusters)} clusters...")
@@ -319,18 +359,30 @@ class ProcessingPipeline:
                     folder_name,
                     parent_folder_id=config.DRIVE_FOLDER_ID
                 )
-                await self._update_job(job_id, {
+                self._queue_update(job_id, {
                     "drive_folder_id": folder_id,
                     "message": "Uploading key visual frames to Google Drive for your report..."
                 })
             except Exception as e:
                 print(f"Error creating Drive folder: {e}")
                 folder_id = config.DRIVE_FOLDER_ID # Fallback
+            await self._flush(job_id)
             
             # We map "visual_subtopics" (Phase 3 result) to "frame_analyses" (Phase 1 structure)
             # Upload hero frames in parallel for speed
             print(f"⚡ Uploading {len(visual_subtopics)} hero frames to Drive in parallel...")
             upload_sem = asyncio.Semaphore(config.MAX_CONCURRENT_UPLOADS)
+            loop = asyncio.get_running_loop()
+            
+            # Reserve all file IDs in one request so upload retries can't create duplicates
+            try:
+                file_ids = await loop.run_in_executor(
+                    _upload_pool, drive_service.generate_ids, len(visual_subtopics)
+                ) if visual_subtopics else []
+            except Exception as e:
+                print(f"Warning: Could not pre-generate Drive file IDs: {e}")
+                file_ids = []
+            uploaded_ids = []
             
             async def upload_single_frame(index, item):
                 """Upload a single hero frame to Drive with concurrency control"""
@@ -341,14 +393,21 @@ class ProcessingPipeline:
                 async with upload_sem:
                     try:
                         if os.path.exists(frame_path):
-                            # Run sync Drive upload in a thread to avoid blocking
-                            uploaded = await asyncio.to_thread(
-                                drive_service.upload_file,
-                                frame_path,
-                                folder_id,
-                                f"hero_{index:02d}_{int(timestamp)}s.jpg"
+                            # Run sync Drive upload on the upload pool to avoid blocking;
+                            # permissions are granted in one batch once all uploads finish
+                            uploaded = await loop.run_in_executor(
+                                _upload_pool,
+                                functools.partial(
+                                    drive_service.upload_file,
+                                    frame_path,
+                                    folder_id,
+                                    f"hero_{index:02d}_{int(timestamp)}s.jpg",
+                                    file_id=file_ids[index] if index < len(file_ids) else None,
+                                    set_permission=False
+                                )
                             )
                             file_id = uploaded.get("id")
+                            uploaded_ids.append(file_id)
                             drive_url = f"https://drive.google.com/thumbnail?id={file_id}&sz=w800"
                     except Exception as e:
                         print(f"Error uploading frame {frame_path}: {e}")
@@ -369,17 +428,21 @@ class ProcessingPipeline:
             ]
             upload_results = await asyncio.gather(*upload_tasks, return_exceptions=True)
             
-            # Collect results in order
-            frame_analyses = []
-            for result in sorted(upload_results, key=lambda x: x[0] if not isinstance(x, Exception) else float('inf')):
+            # Place results by index (keeps input order without sorting)
+            frame_analyses = [None] * len(visual_subtopics)
+            for result in upload_results:
                 if isinstance(result, Exception):
                     print(f"  Upload error: {result}")
                     continue
-                _, analysis = result
-                frame_analyses.append(analysis)
+                i, analysis = result
+                frame_analyses[i] = analysis
+            frame_analyses = [a for a in frame_analyses if a is not None]
+            
+            if uploaded_ids:
+                await loop.run_in_executor(_upload_pool, drive_service.set_file_permissions, uploaded_ids)
 
             
-            await self._update_job(job_id, {
+            self._queue_update(job_id, {
                 "progress": 0.85,
                 "visual_subtopics": visual_subtopics,
                 "message": "Almost there! Combining all insights into your final structured report..."
@@ -473,9 +536,19 @@ class ProcessingPipeline:
             
         except Exception as e:
             print(f"Error processing job {job_id}: {e}")
+            # Don't leave the background frame extraction running (or its error unretrieved)
+            if frames_task is not None and not frames_task.done():
+                frames_task.cancel()
+            if frames_task is not None:
+                try:
+                    await frames_task
+                except (asyncio.CancelledError, Exception):
+                    pass
             # Refund credits if they were charged
             try:
-                failed_job = await self._get_job(job_id)
+                # Queued updates may still hold fields the lookup below reads
+                await self._flush_quietly(job_id)
+                failed_job = await self._get_job(job_id, {"credits_charged": 1, "user_id": 1})
                 charged = failed_job.get("credits_charged", 0)
                 failed_user_id = failed_job.get("user_id")
                 if charged and charged > 0 and failed_user_id:
@@ -507,7 +580,7 @@ class ProcessingPipeline:
             # Update video name if not set
             if not job.get("video_name"):
                 filename = os.path.basename(video_path)
-                await self._update_job(str(job["_id"]), {
+                self._queue_update(str(job["_id"]), {
                     "video_name": filename
                 })
             
@@ -525,7 +598,7 @@ class ProcessingPipeline:
             
             # Get video metadata
             try:
-                video_info = youtube_service.get_video_info(video_id)
+                video_info = await asyncio.to_thread(youtube_service.get_video_info, video_id)
                 video_name = video_info.get("title", f"video_{job['_id']}.mp4")
                 duration = video_info.get("duration", 0)
             except Exception as e:
@@ -534,7 +607,7 @@ class ProcessingPipeline:
                 duration = None
             
             # Update job with video info
-            await self._update_job(str(job["_id"]), {
+            self._queue_update(str(job["_id"]), {
                 "youtube_video_id": video_id,
                 "video_name": video_name,
                 "video_source": "youtube"
@@ -543,7 +616,9 @@ class ProcessingPipeline:
             # Download video using yt-dlp + PO Token server (most reliable on Render)
             try:
                 print(f"Downloading YouTube video {video_id} using yt-dlp strategy...")
-                youtube_service.download_video(youtube_url, video_path, video_id)
+                # yt-dlp blocks for the whole download; keep it off the event loop
+                # so concurrent jobs (e.g. playlist videos) keep making progress
+                await asyncio.to_thread(youtube_service.download_video, youtube_url, video_path, video_id)
             except Exception as e:
                 print(f"yt-dlp download failed: {e}")
                 print("Falling back to Playwright (may fail on Render)...")
@@ -566,54 +641,274 @@ class ProcessingPipeline:
             video_name = metadata.get("name", f"video_{job['_id']}.mp4")
             
             # Update job with file info
-            await self._update_job(str(job["_id"]), {
+            self._queue_update(str(job["_id"]), {
                 "drive_file_id": file_id,
                 "video_name": video_name,
                 "video_source": "drive"
             })
             
-            # Download to temp directory
-            drive_service.download_file(file_id, video_path)
+            # Download to temp directory, extracting audio from the same byte stream
+            audio_path = os.path.join(config.TEMP_DIR, f"{job['_id']}_audio.wav")
+            audio_proc = self.ffmpeg.open_audio_pipe(audio_path)
+            try:
+                drive_service.download_file(file_id, video_path, mirror=audio_proc.stdin)
+            except Exception:
+                # Don't leave audio from a truncated stream behind for _extract_audio
+                if self.ffmpeg.close_audio_pipe(audio_proc, audio_path):
+                    os.remove(audio_path)
+                raise
+            if not self.ffmpeg.close_audio_pipe(audio_proc, audio_path):
+                print("Streamed audio extraction unavailable for this file; will extract after download")
         
         return video_path
     
+    async def _transcript_cache_key(self, job: Dict, video_source: str, video_path: str) -> str:
+        """Stable per-video key: YouTube ID, Drive file ID, or a hash of the uploaded file"""
+        try:
+            if video_source == "youtube" and job.get("youtube_url"):
+                return f"youtube:{youtube_service.extract_video_id(job['youtube_url'])}"
+            if video_source == "drive" and job.get("drive_video_url"):
+                return f"drive:{drive_service.extract_file_id(job['drive_video_url'])}"
+        except ValueError:
+            pass
+        
+        def fingerprint():
+            # First MB + size is enough to tell uploads apart without reading GBs
+            with open(video_path, "rb") as f:
+                digest = hashlib.sha256(f.read(1024 * 1024))
+            digest.update(str(os.path.getsize(video_path)).encode())
+            return digest.hexdigest()
+        
+        return f"{video_source}:{await asyncio.to_thread(fingerprint)}"
+    
+    async def _load_cached_transcript(self, cache_key: str):
+        """Fetch a cached transcript/genre/cues entry, or None"""
+        try:
+            entry = await db.get_db().transcript_cache.find_one({"_id": cache_key})
+            if not entry:
+                return None
+            data = unpack(entry["data"])
+            data["transcript_dicts"] = data["transcript"]
+            data["transcript"] = [TranscriptSegment(**seg) for seg in data["transcript"]]
+            return data
+        except Exception as e:
+            print(f"Warning: Transcript cache lookup failed (non-fatal): {e}")
+            return None
+    
+    async def _store_cached_transcript(self, cache_key: str, transcript_dicts, audio_cues, genre_info):
+        """Save transcript/genre/cues for reuse; entries expire via the TTL index on created_at"""
+        if not transcript_dicts:
+            return
+        payload = {
+            "transcript": transcript_dicts,
+            "audio_visual_cues": audio_cues,
+            "genre_info": genre_info,
+        }
+        try:
+            await db.get_db().transcript_cache.update_one(
+                {"_id": cache_key},
+                {"$set": {
+                    "data": pack(payload),
+                    "created_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Warning: Transcript cache write failed (non-fatal): {e}")
+    
+    async def _run_gatekeeper(self, gate_clusters: list, representatives: list):
+        """
+        Ask Gemini whether each cluster's representative frame carries useful visuals.
+        Returns (visual_rois, useful_frames, kept_clusters); a useful verdict keeps all
+        of that cluster's frames (not just its blur-ranked candidates).
+        """
+        useful_frames = []
+        visual_rois = []
+        kept_clusters = 0
+
+        # Semaphore to limit concurrent Gemini Vision calls (tuned in config.py)
+        gate_sem = asyncio.Semaphore(config.MAX_CONCURRENT_VISION_TASKS)
+
+        def budgeted_evaluation(frame_path, blocking):
+            """The Gatekeeper call within the shared Vision RPM/TPM budgets"""
+            async def within_tokens():
+                # The Gemini coroutine is only created once the request budget let us in,
+                # so a declined non-blocking transact has nothing left unawaited
+                return await vision_tokens.transact(
+                    gemini_service.evaluate_frame_content(frame_path),
+                    credits=config.GEMINI_TOKENS_PER_FRAME,
+                    refund_time=config.GEMINI_QUOTA_WINDOW,
+                    blocking=blocking
+                )
+            return vision_requests.transact(
+                within_tokens(),
+                credits=1,
+                refund_time=config.GEMINI_QUOTA_WINDOW,
+                blocking=blocking
+            )
+
+        async def evaluate_single_frame(index, frame_path, timestamp):
+            """Evaluate a single frame with concurrency control"""
+            async with gate_sem:
+                evaluation = await budgeted_evaluation(frame_path, blocking=False)
+                if is_rate_limited(evaluation):
+                    if evaluation["retry_at"] - time.time() > config.GATEKEEPER_MAX_CREDIT_WAIT:
+                        # Other jobs hold the Vision budget: keep the frame rather than
+                        # stall this job for most of a quota window
+                        evaluation = {
+                            "category": "deferred",
+                            "information_density": "unknown",
+                            "contains_text": False,
+                            "is_useful": True
+                        }
+                    else:
+                        evaluation = await budgeted_evaluation(frame_path, blocking=True)
+                return index, frame_path, timestamp, evaluation
+
+        # The same slide often recurs at different points (and across videos):
+        # evaluate each distinct dHash once, reusing verdicts cached by earlier jobs
+        rep_hashes = [c["candidates"][0]["hash"] for c in gate_clusters]
+        evaluations = await self._load_cached_evaluations(set(rep_hashes))
+        first_index_by_hash = {}
+        for i, frame_hash in enumerate(rep_hashes):
+            first_index_by_hash.setdefault(frame_hash, i)
+        print(f"Gatekeeper: {len(first_index_by_hash)} distinct visuals, "
+              f"{sum(1 for h in first_index_by_hash if h in evaluations)} already evaluated")
+
+        # Launch the remaining frame evaluations in parallel
+        gate_tasks = [
+            evaluate_single_frame(i, *representatives[i])
+            for frame_hash, i in first_index_by_hash.items()
+            if frame_hash not in evaluations
+        ]
+
+        # Handle verdicts as they land so bookkeeping overlaps the slowest calls
+        fresh_evaluations = {}
+        verdict_counts = {}  # category -> [kept, dropped], logged once at the end
+        for next_result in asyncio.as_completed(gate_tasks):
+            try:
+                i, frame_path, timestamp, evaluation = await next_result
+            except Exception as e:
+                print(f"  Frame evaluation error: {e}")
+                continue
+
+            evaluations[rep_hashes[i]] = evaluation
+            # "error" marks a failed call or an unparseable reply and "deferred" a frame
+            # kept without a call; only real verdicts are cached
+            if evaluation.get("category") not in ("error", "deferred"):
+                fresh_evaluations[rep_hashes[i]] = evaluation
+            is_useful = evaluation.get("is_useful", False)
+            category = evaluation.get("category", "unknown")
+            verdict_counts.setdefault(category, [0, 0])[0 if is_useful else 1] += 1
+
+        if verdict_counts:
+            print("  Verdicts: " + ", ".join(
+                f"{category} {kept} kept/{dropped} dropped"
+                for category, (kept, dropped) in sorted(verdict_counts.items())
+            ))
+
+        await self._store_cached_evaluations(fresh_evaluations)
+
+        # Assemble results in original order
+        for i, (frame_path, timestamp) in enumerate(representatives):
+            evaluation = evaluations.get(rep_hashes[i])
+            if evaluation is None:
+                continue
+            visual_rois.append({
+                "timestamp": timestamp,
+                "timestamp_str": self.ffmpeg.format_timestamp(timestamp),
+                "frame_path": frame_path,
+                "evaluation": evaluation
+            })
+            if evaluation.get("is_useful", False):
+                # The verdict applies to every frame in the representative's cluster
+                kept_clusters += 1
+                useful_frames.extend(
+                    (f["path"], f["timestamp"]) for f in gate_clusters[i]["frames"]
+                )
+        
+        return visual_rois, useful_frames, kept_clusters
+    
+    async def _load_cached_evaluations(self, frame_hashes: set) -> Dict[str, Dict]:
+        """Gatekeeper verdicts previously stored for these dHashes"""
+        if not frame_hashes:
+            return {}
+        try:
+            cursor = db.get_db().frame_eval_cache.find({"_id": {"$in": list(frame_hashes)}})
+            return {doc["_id"]: doc["evaluation"] async for doc in cursor}
+        except Exception as e:
+            print(f"Warning: Frame evaluation cache lookup failed (non-fatal): {e}")
+            return {}
+    
+    async def _store_cached_evaluations(self, evaluations: Dict[str, Dict]):
+        """Save Gatekeeper verdicts by dHash; entries expire via the TTL index on created_at"""
+        if not evaluations:
+            return
+        now = datetime.utcnow()
+        try:
+            await db.get_db().frame_eval_cache.bulk_write([
+                UpdateOne(
+                    {"_id": frame_hash},
+                    {"$set": {"evaluation": evaluation, "created_at": now}},
+                    upsert=True
+                )
+                for frame_hash, evaluation in evaluations.items()
+            ], ordered=False)
+        except Exception as e:
+            print(f"Warning: Frame evaluation cache write failed (non-fatal): {e}")
+    
     async def _extract_audio(self, video_path: str, job_id: str) -> str:
         """Extract audio from video"""
         audio_path = os.path.join(config.TEMP_DIR, f"{job_id}_audio.wav")
-        self.ffmpeg.extract_audio(video_path, audio_path)
+        
+        # Already produced while downloading (see _download_video)
+        if not (os.path.exists(audio_path) and os.path.getsize(audio_path) > 0):
+            self.ffmpeg.extract_audio(video_path, audio_path)
         
         # Store audio path in database for downloads
-        await self._update_job(job_id, {
+        self._queue_update(job_id, {
             "audio_path": audio_path
         })
         
         return audio_path
     
-    async def _transcribe_audio(self, audio_path: str) -> list[TranscriptSegment]:
-        """Transcribe audio in chunks — runs chunks in parallel for speed"""
+    async def _transcribe_audio(
+        self,
+        audio_path: str,
+        failures: Optional[list] = None
+    ) -> tuple[list[TranscriptSegment], list[dict]]:
+        """
+        Transcribe audio in chunks — runs chunks in parallel for speed.
+        Returns the typed segments plus plain dicts ready for MongoDB.
+        Chunks that failed or fell back to untimed text are appended to `failures`.
+        """
+        if failures is None:
+            failures = []
         # Split audio into chunks
         chunks = self.ffmpeg.split_audio(audio_path)
         
         # Semaphore to limit concurrent Gemini API calls (tuned in config.py)
         sem = asyncio.Semaphore(config.MAX_CONCURRENT_TRANSCRIBES)
         
-        async def transcribe_chunk(chunk_path, start_time):
-            """Transcribe a single chunk with concurrency control"""
+        async def transcribe_chunk(chunk_path, start_time, end_time):
+            """Transcribe a single chunk with concurrency control, charged by its audio length against the shared budget"""
             async with sem:
                 try:
-                    segments = await gemini_service.transcribe_audio(
-                        chunk_path, 
-                        start_time
+                    segments = await transcribe_credits.transact(
+                        gemini_service.transcribe_audio(chunk_path, start_time, failures),
+                        credits=end_time - start_time,
+                        refund_time=config.GEMINI_QUOTA_WINDOW
                     )
                     return segments
                 except Exception as e:
                     print(f"Error transcribing chunk {chunk_path}: {e}")
+                    failures.append(f"transcribe:{chunk_path}")
                     return []
         
         # Launch all chunks in parallel
         print(f"⚡ Transcribing {len(chunks)} audio chunks in parallel...")
         tasks = [
-            transcribe_chunk(chunk_path, start_time)
+            transcribe_chunk(chunk_path, start_time, end_time)
             for chunk_path, start_time, end_time in chunks
         ]
         results = await asyncio.gather(*tasks)
@@ -624,28 +919,44 @@ class ProcessingPipeline:
             all_segments.extend(segments)
         
         # Clean up all chunk files after parallel processing is done
-        for chunk_path, _, _ in chunks:
-            try:
-                if os.path.exists(chunk_path):
-                    import gc
-                    gc.collect()
-                    for attempt in range(5):
-                        try:
-                            time.sleep(0.3)
-                            os.remove(chunk_path)
-                            break
-                        except (PermissionError, OSError):
-                            if attempt < 4:
-                                time.sleep(0.5)
-                            else:
-                                print(f"Warning: Could not delete {chunk_path} after retries, skipping")
-            except Exception as cleanup_err:
+        # (deletes run concurrently off the event loop)
+        cleanup_results = await asyncio.gather(
+            *[self._remove_chunk(chunk_path) for chunk_path, _, _ in chunks],
+            return_exceptions=True
+        )
+        for cleanup_err in cleanup_results:
+            if isinstance(cleanup_err, Exception):
                 print(f"Warning: Chunk cleanup error (non-fatal): {cleanup_err}")
         
         # Deduplicate overlapping segments
         deduplicated = self._deduplicate_segments(all_segments)
         
-        return deduplicated
+        # Plain dicts (None fields dropped) instead of a model_dump() per segment
+        transcript_dicts = [
+            {k: v for k, v in (
+                ("text", seg.text),
+                ("start_time", seg.start_time),
+                ("end_time", seg.end_time),
+                ("speaker", seg.speaker),
+                ("confidence", seg.confidence),
+            ) if v is not None}
+            for seg in deduplicated
+        ]
+        
+        return deduplicated, transcript_dicts
+    
+    async def _remove_chunk(self, chunk_path: str, attempts: int = 2):
+        """Delete a chunk file in a worker thread, retrying once if it is still locked"""
+        for attempt in range(attempts):
+            try:
+                await asyncio.to_thread(os.remove, chunk_path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                if attempt < attempts - 1:
+                    await asyncio.sleep(0.05)
+        print(f"Warning: Could not delete {chunk_path} after retries, skipping")
     
     def _deduplicate_segments(
         self, 
@@ -658,46 +969,62 @@ class ProcessingPipeline:
         # Sort by start time
         sorted_segments = sorted(segments, key=lambda x: x.start_time)
         
-        deduplicated = [sorted_segments[0]]
+        deduplicated = []
+        
+        # The segment being built is tracked as plain fields; merged text is
+        # collected in a list and a TranscriptSegment is only built once it is final
+        last_seg = sorted_segments[0]
+        last_parts = None  # text pieces when last_seg has absorbed neighbours
+        last_start, last_end = last_seg.start_time, last_seg.end_time
+        last_len, last_speaker = len(last_seg.text), last_seg.speaker
+        
+        def finish():
+            if last_parts is None:
+                return last_seg
+            return TranscriptSegment(
+                text=" ".join(last_parts),
+                start_time=last_start,
+                end_time=last_end,
+                speaker=last_speaker
+            )
         
         for seg in sorted_segments[1:]:
-            last_seg = deduplicated[-1]
+            seg_start, seg_end = seg.start_time, seg.end_time
             
             # If this segment overlaps significantly (>70% overlap), merge or skip
-            overlap_start = max(seg.start_time, last_seg.start_time)
-            overlap_end = min(seg.end_time, last_seg.end_time)
-            overlap_duration = max(0, overlap_end - overlap_start)
-            
-            last_duration = last_seg.end_time - last_seg.start_time
-            seg_duration = seg.end_time - seg.start_time
-            
-            # If high overlap (>70% of either segment), prefer the one with more text or merge them
-            if last_duration > 0 and overlap_duration / last_duration > 0.7:
-                # Merge: keep the longer segment or the one with more text
-                if len(seg.text) > len(last_seg.text) or seg_duration > last_duration:
-                    deduplicated[-1] = seg
-                continue
-            elif seg_duration > 0 and overlap_duration / seg_duration > 0.7:
-                # Same check from other direction
-                if len(seg.text) > len(last_seg.text) or seg_duration > last_duration:
-                    deduplicated[-1] = seg
+            overlap_duration = max(0, min(seg_end, last_end) - max(seg_start, last_start))
+            
+            last_duration = last_end - last_start
+            seg_duration = seg_end - seg_start
+            
+            # If high overlap (>70% of either segment), prefer the one with more text
+            if ((last_duration > 0 and overlap_duration / last_duration > 0.7) or
+                    (seg_duration > 0 and overlap_duration / seg_duration > 0.7)):
+                # Keep the longer segment or the one with more text
+                if len(seg.text) > last_len or seg_duration > last_duration:
+                    last_seg, last_parts = seg, None
+                    last_start, last_end = seg_start, seg_end
+                    last_len, last_speaker = len(seg.text), seg.speaker
                 continue
             
             # If segments are very close (< 2 seconds gap), merge them
-            gap = seg.start_time - last_seg.end_time
+            gap = seg_start - last_end
             if gap < 2 and gap > -2:  # Very close segments, merge
                 # Merge text and extend end time
-                merged_text = last_seg.text + " " + seg.text
-                deduplicated[-1] = TranscriptSegment(
-                    text=merged_text,
-                    start_time=last_seg.start_time,
-                    end_time=max(last_seg.end_time, seg.end_time),
-                    speaker=last_seg.speaker or seg.speaker
-                )
+                if last_parts is None:
+                    last_parts = [last_seg.text]
+                last_parts.append(seg.text)
+                last_len += 1 + len(seg.text)
+                last_end = max(last_end, seg_end)
+                last_speaker = last_speaker or seg.speaker
                 continue
             
-            deduplicated.append(seg)
+            deduplicated.append(finish())
+            last_seg, last_parts = seg, None
+            last_start, last_end = seg_start, seg_end
+            last_len, last_speaker = len(seg.text), seg.speaker
         
+        deduplicated.append(finish())
         return deduplicated
     
     async def _extract_frames(
@@ -710,8 +1037,10 @@ class ProcessingPipeline:
         """Extract keyframes from video"""
         frames_dir = os.path.join(config.TEMP_DIR, f"{job_id}_frames")
         
-        # Extract frames at regular intervals
-        frames = self.ffmpeg.extract_keyframes(
+        # Extract frames at regular intervals (in a worker thread so ffmpeg
+        # runs alongside whatever the event loop is doing)
+        frames = await asyncio.to_thread(
+            self.ffmpeg.extract_keyframes,
             video_path,
             frames_dir,
             interval=interval
@@ -775,6 +1104,48 @@ class ProcessingPipeline:
         
         topics = []
         
+        # Index frames by time once so each topic/sub-topic lookup is a binary search.
+        # Entries keep their original position to preserve frame order within a topic.
+        by_time = []
+        for idx, analysis in enumerate(frame_analyses):
+            frame_ts = analysis.get("timestamp", 0)
+            if isinstance(frame_ts, str):
+                frame_ts = timestamp_to_seconds(frame_ts)
+            by_time.append((frame_ts, idx))
+        by_time.sort()
+        by_time_ts = [ts for ts, _ in by_time]
+        
+        # Sub-topic matching only considers frames with numeric timestamps
+        numeric = sorted(
+            (fa.get("timestamp", 0), idx)
+            for idx, fa in enumerate(frame_analyses)
+            if not isinstance(fa.get("timestamp", 0), str)
+        )
+        numeric_ts = [ts for ts, _ in numeric]
+        
+        # First analysis per Drive URL, for sub-topics that already carry an image_url
+        fa_by_url = {}
+        for fa in frame_analyses:
+            fa_by_url.setdefault(fa.get("drive_url"), fa)
+        
+        def closest_frame_idx(target: float):
+            """Original index of the nearest numeric-timestamp frame within 2s (earliest on ties)."""
+            pos = bisect.bisect_left(numeric_ts, target)
+            best = None
+            candidates = []
+            if pos < len(numeric):
+                candidates.append(pos)  # first frame at or after target
+            if pos > 0:
+                candidates.append(bisect.bisect_left(numeric_ts, numeric_ts[pos - 1]))
+            for c in candidates:
+                # Frames sharing this timestamp; the earliest in the input wins
+                end = bisect.bisect_right(numeric_ts, numeric_ts[c])
+                idx = min(i for _, i in numeric[c:end])
+                key = (abs(numeric_ts[c] - target), idx)
+                if key[0] < 2.0 and (best is None or key < best):
+                    best = key
+            return best[1] if best else None
+        
         for topic_info in topic_data:
             # Parse timestamp range - ensure we have valid timestamps
             ts_range = topic_info.get("timestamp_range", ["00:00:00", "00:00:00"])
@@ -795,21 +1166,20 @@ class ProcessingPipeline:
             
             # Find frames within this topic's time range
             topic_frames = []
-            for analysis in frame_analyses:
-                frame_ts = analysis.get("timestamp", 0)
-                if isinstance(frame_ts, str):
-                    frame_ts = timestamp_to_seconds(frame_ts)
-                    
-                if start_seconds <= frame_ts <= end_seconds:
-                    frame = Frame(
-                        timestamp=seconds_to_timestamp(frame_ts),
-                        frame_number=len(topic_frames),
-                        drive_url=analysis.get("drive_url"),
-                        description=analysis.get("description"),
-                        ocr_text=analysis.get("ocr_text"),
-                        type=analysis.get("type", "other")
-                    )
-                    topic_frames.append(frame)
+            lo = bisect.bisect_left(by_time_ts, start_seconds)
+            hi = bisect.bisect_right(by_time_ts, end_seconds)
+            for frame_ts, idx in sorted(by_time[lo:hi], key=lambda entry: entry[1]):
+                analysis = frame_analyses[idx]
+                frame = Frame(
+                    timestamp=seconds_to_timestamp(frame_ts),
+                    frame_number=len(topic_frames),
+                    drive_url=analysis.get("drive_url"),
+                    description=analysis.get("description"),
+                    ocr_text=analysis.get("ocr_text"),
+                    type=analysis.get("type", "other")
+                )
+                topic_frames.append(frame)
+            seen_urls = {frame.drive_url for frame in topic_frames}
             
             # Sub-topics processing (Phase 4)
             sub_topics_instances = []
@@ -821,25 +1191,15 @@ class ProcessingPipeline:
                 
                 if not img_url and sub_ts is not None:
                     # Find closest frame in frame_analyses
-                    closest_diff = 2.0
-                    closest_frame = None
-                    for fa in frame_analyses:
-                        fa_ts = fa.get("timestamp", 0)
-                        if isinstance(fa_ts, str): continue
-                        diff = abs(fa_ts - float(sub_ts))
-                        if diff < closest_diff:
-                            closest_diff = diff
-                            closest_frame = fa
+                    closest_idx = closest_frame_idx(float(sub_ts))
+                    closest_frame = frame_analyses[closest_idx] if closest_idx is not None else None
                     
                     if closest_frame:
                          img_url = closest_frame.get("drive_url")
                          matched_fa = closest_frame
                 elif img_url:
                     # Find the fa for this img_url to add to frames later
-                    for fa in frame_analyses:
-                        if fa.get("drive_url") == img_url:
-                            matched_fa = fa
-                            break
+                    matched_fa = fa_by_url.get(img_url)
                 
                 # Add to sub_topics list
                 sub_topics_instances.append(SubTopic(
@@ -852,13 +1212,8 @@ class ProcessingPipeline:
                 # ALSO: Ensure this frame is in the main topic_frames list for Topic Covered section
                 if matched_fa:
                     # Check if already present to avoid duplicates
-                    exists = False
-                    for existing in topic_frames:
-                        if existing.drive_url == matched_fa.get("drive_url"):
-                            exists = True
-                            break
-                    
-                    if not exists:
+                    if matched_fa.get("drive_url") not in seen_urls:
+                        seen_urls.add(matched_fa.get("drive_url"))
                         topic_frames.append(Frame(
                             timestamp=seconds_to_timestamp(matched_fa.get("timestamp", 0)),
                             frame_number=len(topic_frames),
@@ -895,64 +1250,131 @@ class ProcessingPipeline:
         # Only clean up video and frames
         
         # Get job to check video source
-        job = await self._get_job(job_id)
+        job = await self._get_job(job_id, {"video_source": 1})
         video_source = job.get("video_source", "drive")
         
+        if video_source == "upload":
+            # For uploaded files, keep the original video but could clean up later
+            print(f"Keeping uploaded video file for job {job_id}")
+        
+        # Hundreds of unlinks; run them off the event loop so status polls stay responsive
+        await asyncio.to_thread(self._remove_temp_files, job_id, video_source != "upload")
+    
+    @staticmethod
+    def _remove_temp_files(job_id: str, remove_video: bool):
+        """Blocking part of _cleanup: delete the downloaded video and the frames directory"""
         # Only delete video if it's not an uploaded file (uploaded files should be kept until manually deleted)
-        if video_source != "upload":
+        if remove_video:
             patterns = [f"{job_id}_video.mp4"]
             for pattern in patterns:
                 path = os.path.join(config.TEMP_DIR, pattern)
-                if os.path.exists(path):
-                    try:
-                        os.remove(path)
-                    except Exception as e:
-                        print(f"Error removing {path}: {e}")
-        else:
-            # For uploaded files, keep the original video but could clean up later
-            print(f"Keeping uploaded video file for job {job_id}")
+                try:
+                    Path(path).unlink(missing_ok=True)
+                except OSError as e:
+                    print(f"Error removing {path}: {e}")
         
         # Remove frames directory
         frames_dir = os.path.join(config.TEMP_DIR, f"{job_id}_frames")
         if os.path.exists(frames_dir):
             try:
-                import shutil
                 shutil.rmtree(frames_dir)
             except Exception as e:
                 print(f"Error removing frames directory: {e}")
     
-    async def _get_job(self, job_id: str) -> Dict:
-        """Get job from database"""
+    async def _get_job(self, job_id: str, projection: Optional[Dict] = None) -> Dict:
+        """Get job from database (only the projected fields, if given)"""
         database = db.get_db()
-        job = await database.video_jobs.find_one({"_id": ObjectId(job_id)})
+        job = await database.video_jobs.find_one({"_id": ObjectId(job_id)}, projection)
         if not job:
             raise Exception(f"Job {job_id} not found")
         return job
     
     async def _update_job(self, job_id: str, updates: Dict):
-        """Update job in database with real-time logging support"""
-        database = db.get_db()
+        """
+        Update job in database immediately with real-time logging support.
+        Any changes buffered by _queue_update for this job go out in the same write.
+        """
+        self._queue_update(job_id, updates)
+        await self._flush(job_id)
+    
+    def _queue_update(self, job_id: str, updates: Dict):
+        """
+        Buffer job field changes until the next _flush/_update_job
+        (or _QUEUED_UPDATE_MAX_AGE seconds, whichever comes first).
+        Used for intra-phase progress so consecutive updates share one round-trip.
+        """
+        pending = self._pending_updates.get(job_id)
+        if pending is None:
+            pending = self._pending_updates[job_id] = {"set": {}, "logs": []}
+            asyncio.get_running_loop().call_later(
+                _QUEUED_UPDATE_MAX_AGE, self._schedule_flush, job_id, pending
+            )
+        updates = dict(updates)
         
         # If a message is provided, add it to processing_logs and set as current_action
         if "message" in updates:
             msg = updates.pop("message")
-            log_entry = {
+            pending["logs"].append({
                 "message": msg,
                 "timestamp": datetime.utcnow().isoformat()
-            }
-            await database.video_jobs.update_one(
+            })
+            pending["set"]["current_action"] = msg
+        
+        pending["set"].update(updates)
+    
+    def _schedule_flush(self, job_id: str, pending: Dict):
+        """Timer callback: write `pending` if no phase-boundary flush has taken it yet"""
+        if self._pending_updates.get(job_id) is pending:
+            asyncio.ensure_future(self._flush_quietly(job_id))
+    
+    async def _flush_quietly(self, job_id: str):
+        try:
+            await self._flush(job_id)
+        except Exception as e:
+            print(f"Error writing queued updates for job {job_id}: {e}")
+    
+    async def _flush(self, job_id: str):
+        """Write all buffered changes for a job in a single update_one"""
+        lock = self._flush_locks.get(job_id)
+        if lock is None:
+            lock = self._flush_locks[job_id] = asyncio.Lock()
+        # Serialized so an older batch (e.g. from the timer) can never land after a newer one
+        async with lock:
+            await self._write_pending(job_id)
+    
+    async def _write_pending(self, job_id: str):
+        pending = self._pending_updates.pop(job_id, None)
+        if not pending:
+            return
+        
+        set_fields = pending["set"]
+        artifacts = {
+            field: set_fields.pop(field)
+            for field in JOB_ARTIFACT_FIELDS if field in set_fields
+        }
+        for field in COMPRESSED_ARTIFACT_FIELDS:
+            if field in artifacts:
+                artifacts[f"{field}_z"] = pack(artifacts.pop(field))
+        set_fields["updated_at"] = datetime.utcnow()
+        update = {"$set": set_fields}
+        if pending["logs"]:
+            update["$push"] = {"processing_logs": {"$each": pending["logs"]}}
+        
+        database = db.get_db()
+        writes = []
+        if artifacts:
+            writes.append(database.job_artifacts.update_one(
                 {"_id": ObjectId(job_id)},
-                {
-                    "$push": {"processing_logs": log_entry},
-                    "$set": {"current_action": msg}
-                }
-            )
-            
-        updates["updated_at"] = datetime.utcnow()
-        await database.video_jobs.update_one(
-            {"_id": ObjectId(job_id)},
-            {"$set": updates}
-        )
+                {"$set": artifacts},
+                upsert=True
+            ))
+            if "status" in set_fields:
+                # Readers act on status (e.g. "completed" -> fetch results), so the
+                # artifacts must be stored before the job document says they exist.
+                # (Motor starts a write when it is called, so await before issuing the next.)
+                await writes.pop()
+        writes.append(database.video_jobs.update_one({"_id": ObjectId(job_id)}, update))
+        await asyncio.gather(*writes)
 
 
 # Singleton instance
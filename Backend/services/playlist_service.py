@@ -1,7 +1,8 @@
 import asyncio
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from bson import ObjectId
+import config
 
 from models.database import db
 from models.video_job import VideoJob
@@ -11,7 +12,7 @@ from services.pipeline import pipeline
 
 
 class PlaylistService:
-    """Orchestrates playlist processing — creates a Topic and processes videos sequentially."""
+    """Orchestrates playlist processing — creates a Topic and processes its videos."""
 
     async def create_topic_from_playlist(self, playlist_url: str, user_id: str = None) -> str:
         """
@@ -20,7 +21,7 @@ class PlaylistService:
         """
         # Step 1: Extract playlist metadata via yt-dlp
         print(f"Extracting playlist info from: {playlist_url}")
-        playlist_info = youtube_service.extract_playlist_info(playlist_url)
+        playlist_info = await asyncio.to_thread(youtube_service.extract_playlist_info, playlist_url)
 
         # Step 2: Build TopicVideo list
         videos = []
@@ -55,8 +56,9 @@ class PlaylistService:
 
     async def process_topic(self, topic_id: str):
         """
-        Process all videos in a topic sequentially.
-        Each video goes through the existing pipeline.process_video().
+        Process all videos in a topic through the existing pipeline.process_video().
+        The first PLAYLIST_SERIAL_PREFIX videos run one at a time so the rest start
+        with prior chapters as context; the remainder run MAX_CONCURRENT_PLAYLIST_VIDEOS at a time.
         """
         try:
             database = db.get_db()
@@ -65,94 +67,28 @@ class PlaylistService:
                 print(f"Topic {topic_id} not found")
                 return
 
-            videos = topic.get("videos", [])
-            total = len(videos)
-            user_id = topic.get("user_id")
+            total = len(topic.get("videos", []))
 
             await self._update_topic(topic_id, {
                 "status": "processing",
                 "progress": 0.0
             })
 
-            completed_count = 0
-
-            for i, video_info in enumerate(videos):
-                video_url = video_info.get("video_url")
-                video_title = video_info.get("video_title", f"Video {i+1}")
-
-                print(f"\n{'='*60}")
-                print(f"Processing video {i+1}/{total}: {video_title}")
-                print(f"{'='*60}")
-
-                # Update topic progress
-                await self._update_topic(topic_id, {
-                    "current_video_index": i,
-                    f"videos.{i}.status": "processing",
-                    "progress": completed_count / total if total > 0 else 0
-                })
-
-                try:
-                    # Create a VideoJob for this video (same as existing YouTube flow)
-                    job = VideoJob(
-                        youtube_url=video_url,
-                        video_name=video_title,
-                        video_source="youtube",
-                        user_id=user_id,
-                        topic_id=topic_id,  # Link back to topic
-                        status="pending",
-                        progress=0.0
-                    )
-
-                    result = await database.video_jobs.insert_one(job.dict(by_alias=True))
-                    job_id = str(result.inserted_id)
-
-                    # Update topic with job_id reference
-                    await database.topics.update_one(
-                        {"_id": ObjectId(topic_id)},
-                        {"$set": {f"videos.{i}.job_id": job_id}}
-                    )
-
-                    # Build playlist context from previously completed videos (Phase 2)
-                    playlist_context = await self._build_playlist_context(topic_id, i)
-
-                    # Process through existing pipeline (await completion)
-                    await pipeline.process_video(job_id, playlist_context=playlist_context)
-
-                    # Check actual job status — pipeline catches errors internally
-                    updated_job = await database.video_jobs.find_one(
-                        {"_id": ObjectId(job_id)}, {"status": 1, "error_message": 1}
-                    )
-                    actual_status = updated_job.get("status") if updated_job else "failed"
-
-                    if actual_status == "completed":
-                        # Mark this video as completed
-                        completed_count += 1
-                        await database.topics.update_one(
-                            {"_id": ObjectId(topic_id)},
-                            {"$set": {
-                                f"videos.{i}.status": "completed",
-                                "progress": completed_count / total
-                            }}
-                        )
-                        print(f"✅ Video {i+1}/{total} completed: {video_title}")
-                    else:
-                        # Pipeline marked job as failed internally
-                        error_msg = updated_job.get("error_message", "Unknown error") if updated_job else "Unknown error"
-                        print(f"❌ Video {i+1}/{total} failed (pipeline error): {video_title} — {error_msg}")
-                        await database.topics.update_one(
-                            {"_id": ObjectId(topic_id)},
-                            {"$set": {f"videos.{i}.status": "failed"}}
-                        )
-
-                except Exception as e:
-                    import traceback
-                    print(f"❌ Video {i+1}/{total} failed: {video_title} — {e}")
-                    traceback.print_exc()
-                    await database.topics.update_one(
-                        {"_id": ObjectId(topic_id)},
-                        {"$set": {f"videos.{i}.status": "failed"}}
-                    )
-                    # Continue with next video even if one fails
+            prefix = min(config.PLAYLIST_SERIAL_PREFIX, total)
+            results = []
+            for i in range(prefix):
+                results.append(await self._process_video(topic, i))
+
+            video_sem = asyncio.Semaphore(config.MAX_CONCURRENT_PLAYLIST_VIDEOS)
+
+            async def process_bounded(i: int) -> bool:
+                async with video_sem:
+                    return await self._process_video(topic, i)
+
+            results.extend(await asyncio.gather(*[
+                process_bounded(i) for i in range(prefix, total)
+            ]))
+            completed_count = sum(results)
 
             # All videos processed
             final_progress = completed_count / total if total > 0 else 1.0
@@ -177,16 +113,99 @@ class PlaylistService:
                 "error_message": str(e)
             })
 
-    async def _build_playlist_context(self, topic_id: str, current_index: int) -> Optional[str]:
+    async def _process_video(self, topic: Dict, i: int) -> bool:
+        """
+        Run one playlist video through the pipeline. Returns True if it completed.
+        Status and job_id are mirrored into the in-memory topic, which later
+        videos read their playlist context from.
+        """
+        database = db.get_db()
+        topic_id = str(topic["_id"])
+        video_info = topic["videos"][i]
+        total = len(topic["videos"])
+        user_id = topic.get("user_id")
+        video_url = video_info.get("video_url")
+        video_title = video_info.get("video_title", f"Video {i+1}")
+
+        print(f"\n{'='*60}")
+        print(f"Processing video {i+1}/{total}: {video_title}")
+        print(f"{'='*60}")
+
+        try:
+            # Create a VideoJob for this video (same as existing YouTube flow)
+            job = VideoJob(
+                youtube_url=video_url,
+                video_name=video_title,
+                video_source="youtube",
+                user_id=user_id,
+                topic_id=topic_id,  # Link back to topic
+                status="pending",
+                progress=0.0
+            )
+
+            result = await database.video_jobs.insert_one(job.dict(by_alias=True))
+            job_id = str(result.inserted_id)
+
+            # Mark the video as processing and link its job in one write
+            await self._update_topic(topic_id, {
+                "current_video_index": i,
+                f"videos.{i}.status": "processing",
+                f"videos.{i}.job_id": job_id
+            })
+            video_info.update(status="processing", job_id=job_id)
+
+            # Build playlist context from previously completed videos (Phase 2)
+            playlist_context = await self._build_playlist_context(topic, i)
+
+            # Process through existing pipeline (await completion)
+            await pipeline.process_video(job_id, playlist_context=playlist_context)
+
+            # Check actual job status — pipeline catches errors internally
+            updated_job = await database.video_jobs.find_one(
+                {"_id": ObjectId(job_id)}, {"status": 1, "error_message": 1}
+            )
+            actual_status = updated_job.get("status") if updated_job else "failed"
+
+            if actual_status == "completed":
+                # Mark this video as completed; $inc keeps progress right with videos finishing concurrently
+                await database.topics.update_one(
+                    {"_id": ObjectId(topic_id)},
+                    {
+                        "$set": {f"videos.{i}.status": "completed"},
+                        "$inc": {"progress": 1 / total}
+                    }
+                )
+                video_info["status"] = "completed"
+                print(f"✅ Video {i+1}/{total} completed: {video_title}")
+                return True
+
+            # Pipeline marked job as failed internally
+            error_msg = updated_job.get("error_message", "Unknown error") if updated_job else "Unknown error"
+            print(f"❌ Video {i+1}/{total} failed (pipeline error): {video_title} — {error_msg}")
+            await database.topics.update_one(
+                {"_id": ObjectId(topic_id)},
+                {"$set": {f"videos.{i}.status": "failed"}}
+            )
+            video_info["status"] = "failed"
+
+        except Exception as e:
+            import traceback
+            print(f"❌ Video {i+1}/{total} failed: {video_title} — {e}")
+            traceback.print_exc()
+            await database.topics.update_one(
+                {"_id": ObjectId(topic_id)},
+                {"$set": {f"videos.{i}.status": "failed"}}
+            )
+            video_info["status"] = "failed"
+            # Other videos carry on even if one fails
+
+        return False
+
+    async def _build_playlist_context(self, topic: Dict, current_index: int) -> Optional[str]:
         """Build a context string from previously completed videos in this topic."""
         if current_index == 0:
             return None  # First video has no prior context
 
-        database = db.get_db()
-        topic = await database.topics.find_one({"_id": ObjectId(topic_id)})
-        if not topic:
-            return None
-
         videos = topic.get("videos", [])
         playlist_title = topic.get("title", "")
         total_videos = len(videos)
@@ -198,17 +217,15 @@ class PlaylistService:
         )
         context_parts.append("Previously covered chapters:")
 
+        # Fetch the completed jobs' summaries in one query
+        jobs_by_id = await self._fetch_completed_jobs(
+            videos[:current_index],
+            {"executive_summary": 1, "key_takeaways": 1, "video_name": 1}
+        )
+
         for i in range(current_index):
             v = videos[i]
-            job_id = v.get("job_id")
-            if not job_id or v.get("status") != "completed":
-                continue
-
-            # Fetch the completed job's summary
-            job = await database.video_jobs.find_one(
-                {"_id": ObjectId(job_id)},
-                {"executive_summary": 1, "key_takeaways": 1, "video_name": 1}
-            )
+            job = jobs_by_id.get(v.get("job_id"))
             if job:
                 summary = job.get("executive_summary") or ""
                 # Truncate to keep context manageable
@@ -246,15 +263,13 @@ class PlaylistService:
             videos = topic.get("videos", [])
             chapter_summaries = []
 
-            for i, v in enumerate(videos):
-                job_id = v.get("job_id")
-                if not job_id or v.get("status") != "completed":
-                    continue
+            jobs_by_id = await self._fetch_completed_jobs(
+                videos,
+                {"executive_summary": 1, "key_takeaways": 1, "video_name": 1, "duration": 1}
+            )
 
-                job = await database.video_jobs.find_one(
-                    {"_id": ObjectId(job_id)},
-                    {"executive_summary": 1, "key_takeaways": 1, "video_name": 1, "duration": 1}
-                )
+            for i, v in enumerate(videos):
+                job = jobs_by_id.get(v.get("job_id"))
                 if job:
                     chapter_summaries.append({
                         "chapter_number": i + 1,
@@ -296,6 +311,19 @@ class PlaylistService:
             print(f"⚠️ Failed to generate topic summary for {topic_id}: {e}")
             # Don't fail the whole topic — summary is a bonus
 
+    async def _fetch_completed_jobs(self, videos: List[Dict], projection: Dict) -> Dict[str, Dict]:
+        """Load the jobs of completed topic videos in a single query, keyed by job_id."""
+        job_ids = [
+            ObjectId(v["job_id"]) for v in videos
+            if v.get("job_id") and v.get("status") == "completed"
+        ]
+        if not job_ids:
+            return {}
+
+        database = db.get_db()
+        cursor = database.video_jobs.find({"_id": {"$in": job_ids}}, projection)
+        return {str(job["_id"]): job async for job in cursor}
+
     async def _update_topic(self, topic_id: str, updates: Dict):
         """Update topic in database."""
         database = db.get_db()
@@ -1,16 +1,196 @@
 import os
 import re
-from typing import Optional
+import socket
+import time
+import atexit
+import functools
+import threading
+import weakref
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Tuple
 import yt_dlp
+from yt_dlp.utils import DownloadCancelled
 import config
+from utils.disk_cache import DiskCache
+
+# Compiled once; extract_video_id runs for every job and playlist entry.
+# One pass covers youtu.be/, watch?v= (v anywhere in the query), embed/, shorts/ and v/ URLs.
+# The query walk is bounded (32 params of up to 512 chars) so each candidate start does
+# constant work, keeping long or adversarial URLs linear.
+_ID_RE = re.compile(
+    r'(?:youtu\.be/|youtube\.com/(?:watch\?(?:[^&#\s]{0,512}&){0,32}?v=|embed/|shorts/|v/))([a-zA-Z0-9_-]{11})'
+)
+_ID_ONLY = re.compile(r'[a-zA-Z0-9_-]{11}')
+_PLAYLIST_ID_RE = re.compile(r'[?&]list=([a-zA-Z0-9_-]+)')
+
+# get_video_info / extract_playlist_info results, reused across requests and restarts
+_META_CACHE = DiskCache(
+    os.path.join(config.YOUTUBE_CACHE_DIR, 'metadata.sqlite3'),
+    config.YOUTUBE_METADATA_CACHE_TTL
+)
+
+
+_PROGRESS_LOG_INTERVAL = 5.0  # seconds between download progress lines
+
+# Format preference: avoid HLS (m3u8) which can have fragment issues, prefer progressive mp4
+# download_video tries these in order as fallbacks
+_FORMAT_SELECTORS = (
+    # First try: Progressive MP4 (single file, most reliable)
+    'best[ext=mp4]/bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]',
+    # Second try: Any progressive format (no HLS)
+    'best[protocol!=m3u8_native][ext=mp4]/best[protocol!=m3u8_native]',
+    # Third try: Best available (including HLS as last resort)
+    'best',
+)
+# Download options that don't depend on the request; download_video copies and extends them
+_BASE_DOWNLOAD_OPTS = {
+    'format': _FORMAT_SELECTORS[0],  # Start with best MP4
+    'quiet': True,
+    'no_warnings': True,
+    'no_check_certificate': False,
+    'prefer_insecure': False,
+    'verbose': False,
+    'cachedir': config.YOUTUBE_CACHE_DIR,
+    'fragment_retries': 3,
+    'retries': 3,
+}
+# Extensions yt-dlp may have given the downloaded file, in preference order
+_POSSIBLE_EXTS = ('.mp4', '.webm', '.mkv', '.flv', '.m4a')
+
+
+def _stat_or_none(path: str) -> Optional[os.stat_result]:
+    """One stat() call instead of an exists() + getsize() pair"""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _downloaded_files(base_path: str, extensions: Tuple[str, ...]) -> List[Tuple[str, int]]:
+    """
+    (path, size) of each `base_path + ext` that exists, in `extensions` order.
+    One directory listing instead of a stat per candidate extension.
+    """
+    directory = os.path.dirname(base_path) or '.'
+    prefix = os.path.basename(base_path)
+    sizes = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(prefix) and entry.is_file():
+                    sizes[entry.name[len(prefix):]] = entry.stat().st_size
+    except OSError:
+        return []
+    return [(base_path + ext, sizes[ext]) for ext in extensions if ext in sizes]
+
+
+def _remove_attempt_files(attempt_base: str):
+    """Delete everything a download attempt wrote (finished, .part and fragment files)"""
+    directory = os.path.dirname(attempt_base) or '.'
+    prefix = os.path.basename(attempt_base) + '.'
+    try:
+        with os.scandir(directory) as entries:
+            paths = [entry.path for entry in entries if entry.name.startswith(prefix)]
+    except OSError:
+        return
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_ORIG_GETADDRINFO = socket.getaddrinfo
+_DNS_CACHE_MAX = 256
+_dns_cache = {}
+_dns_local = threading.local()
+_dns_install_lock = threading.Lock()
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """
+    socket.getaddrinfo with results reused for DNS_CACHE_TTL seconds (failures aren't cached).
+    Only lookups made inside _dns_cached() use the cache; every other caller gets a plain lookup.
+    """
+    if not getattr(_dns_local, 'depth', 0):
+        return _ORIG_GETADDRINFO(host, port, family, type, proto, flags)
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    hit = _dns_cache.get(key)
+    if hit is not None and hit[0] > now:
+        return list(hit[1])
+    result = _ORIG_GETADDRINFO(host, port, family, type, proto, flags)
+    if len(_dns_cache) >= _DNS_CACHE_MAX:
+        _dns_cache.clear()
+    _dns_cache[key] = (now + config.DNS_CACHE_TTL, result)
+    return list(result)
+
+
+@contextmanager
+def _dns_cached():
+    """
+    Reuse DNS answers for the yt-dlp call made inside (on this thread): every call
+    resolves youtube.com / googlevideo.com again. No-op unless DNS_CACHE_TTL > 0.
+    """
+    if config.DNS_CACHE_TTL <= 0:
+        yield
+        return
+    if socket.getaddrinfo is not _cached_getaddrinfo:
+        with _dns_install_lock:
+            socket.getaddrinfo = _cached_getaddrinfo
+    _dns_local.depth = getattr(_dns_local, 'depth', 0) + 1
+    try:
+        yield
+    finally:
+        _dns_local.depth -= 1
+
+
+# Metadata lookups reuse a YoutubeDL per thread and option set, keeping its
+# extractors, HTTP connections and player-JS cache warm (instances aren't thread-safe)
+_ydl_local = threading.local()
+_live_ydls = weakref.WeakSet()
+# Long-lived threads for batched lookups, so each thread's YoutubeDL survives across batches
+_lookup_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="yt-lookup")
+
+
+@atexit.register
+def _close_ydls():
+    for ydl in list(_live_ydls):
+        try:
+            ydl.close()
+        except Exception:
+            pass
 
 
 class YouTubeService:
     """Service for downloading YouTube videos"""
     
+    _last_progress_log = 0.0  # time.monotonic() of the last download progress line
+    
+    # The cookies location is fixed for the life of the process, so it is probed once
+    _cookies_resolved = False
+    _cached_cookies_path: Optional[str] = None
+    _setup_logged = False  # _log_download_setup has run for the current cookies path
+    
+    @classmethod
+    def _resolve_cookies_path(cls) -> Optional[str]:
+        """Resolve cookies file path with multiple fallback strategies (cached after the first call)"""
+        if not cls._cookies_resolved:
+            cls._cached_cookies_path = cls._probe_cookies_path()
+            cls._cookies_resolved = True
+        return cls._cached_cookies_path
+    
+    @classmethod
+    def invalidate_cookies_cache(cls):
+        """Forget the resolved cookies path (e.g. after the cookies file is replaced)"""
+        cls._cookies_resolved = False
+        cls._cached_cookies_path = None
+        cls._setup_logged = False
+    
     @staticmethod
-    def _resolve_cookies_path():
-        """Resolve cookies file path with multiple fallback strategies"""
+    def _probe_cookies_path() -> Optional[str]:
+        """Look for the cookies file in each candidate location"""
         if not config.YOUTUBE_COOKIES_PATH:
             return None
         
@@ -34,47 +214,83 @@ class YouTubeService:
             # 5. Try just the filename in Backend directory
             potential_paths.append(os.path.join(script_dir, os.path.basename(config.YOUTUBE_COOKIES_PATH)))
         
-        # Try each potential path
+        # Several candidates are often the same file or share a directory:
+        # dedupe them, and list each shared directory once instead of stat-ing every candidate
+        potential_paths = list(dict.fromkeys(os.path.abspath(path) for path in potential_paths))
+        names_by_dir = {}
         for path in potential_paths:
-            if os.path.exists(path) and os.path.isfile(path):
-                return os.path.abspath(path)
+            names_by_dir.setdefault(os.path.dirname(path), set()).add(os.path.basename(path))
+        
+        files_by_dir = {}
+        for directory, names in names_by_dir.items():
+            if len(names) < 2:
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    files_by_dir[directory] = {e.name for e in entries if e.name in names and e.is_file()}
+            except OSError:
+                files_by_dir[directory] = set()
+        
+        # Try each potential path, in priority order
+        for path in potential_paths:
+            directory = os.path.dirname(path)
+            if directory in files_by_dir:
+                if os.path.basename(path) in files_by_dir[directory]:
+                    return path
+            elif os.path.isfile(path):
+                return path
         
         return None
     
     @staticmethod
     def extract_video_id(youtube_url: str) -> str:
         """Extract video ID from various YouTube URL formats"""
-        patterns = [
-            r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([a-zA-Z0-9_-]{11})',
-            r'youtube\.com\/watch\?.*v=([a-zA-Z0-9_-]{11})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, youtube_url)
-            if match:
-                return match.group(1)
-        
-        # If no match, assume the URL is just the video ID
-        if len(youtube_url) == 11 and re.match(r'^[a-zA-Z0-9_-]+$', youtube_url):
+        # Callers often pass a bare video ID; no URL pattern can match an 11-char string
+        if len(youtube_url) == 11 and _ID_ONLY.fullmatch(youtube_url):
             return youtube_url
         
+        match = _ID_RE.search(youtube_url)
+        if match:
+            return match.group(1)
+        
         raise ValueError(f"Invalid YouTube URL format: {youtube_url}")
     
+    @staticmethod
+    @contextmanager
+    def _reused_ydl(ydl_opts: dict):
+        """Yield a cached YoutubeDL for these options (for metadata only; not closed on exit)"""
+        pool = getattr(_ydl_local, 'pool', None)
+        if pool is None:
+            pool = _ydl_local.pool = {}
+        key = repr(sorted(ydl_opts.items()))
+        ydl = pool.get(key)
+        if ydl is None:
+            ydl = pool[key] = yt_dlp.YoutubeDL(ydl_opts)
+            _live_ydls.add(ydl)
+        yield ydl
+    
     @staticmethod
     def get_video_info(video_id: str) -> dict:
         """Get video metadata without downloading"""
-        proxy_url = os.getenv('PROXY_URL')
+        cache_key = f"video:{video_id}"
+        cached = _META_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        proxy_url = config.PROXY_URL
         
         ydl_opts = {
             'quiet': True,
             'no_warnings': True,
             'skip_download': True,
             'verbose': False,
+            'cachedir': config.YOUTUBE_CACHE_DIR,
+            # Only scalar metadata is returned; don't fetch streaming manifests or subtitle variants
+            'extractor_args': {'youtube': {'skip': ['dash', 'hls', 'translated_subs']}},
         }
         
         if proxy_url:
             ydl_opts['proxy'] = proxy_url
-            print(f"✅ Using proxy for metadata extraction")
         
         # Add cookies if configured (use same path resolution as download_video)
         cookies_path = YouTubeService._resolve_cookies_path()
@@ -83,10 +299,12 @@ class YouTubeService:
         
         url = f"https://www.youtube.com/watch?v={video_id}"
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with YouTubeService._reused_ydl(ydl_opts) as ydl:
             try:
-                info = ydl.extract_info(url, download=False)
-                return {
+                # process=False skips format selection and post-processing of the info dict
+                with _dns_cached():
+                    info = ydl.extract_info(url, download=False, process=False)
+                result = {
                     'title': info.get('title', 'Untitled Video'),
                     'duration': info.get('duration', 0),
                     'description': info.get('description', ''),
@@ -96,6 +314,27 @@ class YouTubeService:
                 }
             except Exception as e:
                 raise Exception(f"Failed to fetch video info: {str(e)}")
+        
+        _META_CACHE.set(cache_key, result)
+        return result
+    
+    @staticmethod
+    def get_video_info_batch(video_ids: List[str]) -> List[Optional[dict]]:
+        """
+        Fetch metadata for several videos concurrently on the shared lookup threads
+        (each lookup is mostly HTTP round-trips). Results are in input order; None
+        where a lookup failed.
+        """
+        def fetch(video_id):
+            try:
+                return YouTubeService.get_video_info(video_id)
+            except Exception as e:
+                print(f"Warning: Could not fetch info for {video_id}: {e}")
+                return None
+        
+        if not video_ids:
+            return []
+        return list(_lookup_pool.map(fetch, video_ids))
     
     @staticmethod
     def extract_playlist_info(playlist_url: str) -> dict:
@@ -107,7 +346,13 @@ class YouTubeService:
         Returns:
             Dict with playlist title, description, channel, and list of videos
         """
-        proxy_url = os.getenv('PROXY_URL')
+        playlist_id = _PLAYLIST_ID_RE.search(playlist_url)
+        cache_key = f"playlist:{playlist_id.group(1) if playlist_id else playlist_url}"
+        cached = _META_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        proxy_url = config.PROXY_URL
         
         ydl_opts = {
             'quiet': True,
@@ -115,19 +360,20 @@ class YouTubeService:
             'extract_flat': 'in_playlist',  # Get metadata only, don't resolve each video
             'skip_download': True,
             'verbose': False,
+            'cachedir': config.YOUTUBE_CACHE_DIR,
         }
         
         if proxy_url:
             ydl_opts['proxy'] = proxy_url
-            print(f"✅ Using proxy for playlist extraction")
         
         cookies_path = YouTubeService._resolve_cookies_path()
         if cookies_path:
             ydl_opts['cookies'] = cookies_path
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with YouTubeService._reused_ydl(ydl_opts) as ydl:
             try:
-                info = ydl.extract_info(playlist_url, download=False)
+                with _dns_cached():
+                    info = ydl.extract_info(playlist_url, download=False)
                 
                 entries = info.get('entries', [])
                 videos = []
@@ -143,7 +389,15 @@ class YouTubeService:
                         'order': i
                     })
                 
-                return {
+                # Flat entries sometimes lack a duration; look those up together
+                missing = [v for v in videos if not v['duration'] and v['video_id']]
+                if missing:
+                    infos = YouTubeService.get_video_info_batch([v['video_id'] for v in missing])
+                    for v, video_info in zip(missing, infos):
+                        if video_info:
+                            v['duration'] = video_info.get('duration') or 0
+                
+                result = {
                     'title': info.get('title', 'Untitled Playlist'),
                     'description': info.get('description', ''),
                     'channel': info.get('uploader', info.get('channel', 'Unknown')),
@@ -152,6 +406,9 @@ class YouTubeService:
                 }
             except Exception as e:
                 raise Exception(f"Failed to extract playlist info: {str(e)}")
+        
+        _META_CACHE.set(cache_key, result)
+        return result
     
     @staticmethod
     def download_video(
@@ -179,67 +436,31 @@ class YouTubeService:
         
         # Configure yt-dlp options for best quality and format
         # Remove extension from output_path for yt-dlp template
-        base_output_path = output_path.rsplit('.', 1)[0] if '.' in os.path.basename(output_path) else output_path
-        
-        # Format preference: avoid HLS (m3u8) which can have fragment issues, prefer progressive mp4
-        # Try multiple format strategies with fallbacks
-        format_selectors = [
-            # First try: Progressive MP4 (single file, most reliable)
-            'best[ext=mp4]/bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]',
-            # Second try: Any progressive format (no HLS)
-            'best[protocol!=m3u8_native][ext=mp4]/best[protocol!=m3u8_native]',
-            # Third try: Best available (including HLS as last resort)
-            'best'
-        ]
+        base_output_path = os.path.splitext(output_path)[0]
         
-        proxy_url = os.getenv('PROXY_URL')
+        proxy_url = config.PROXY_URL
         
-        ydl_opts = {
-            'format': format_selectors[0],  # Start with best MP4
-            'outtmpl': base_output_path + '.%(ext)s',  # yt-dlp will add extension
-            'quiet': True,
-            'no_warnings': True,
-            'progress_hooks': [YouTubeService._progress_hook],
-            'no_check_certificate': False,
-            'prefer_insecure': False,
-            'verbose': False,
-            'fragment_retries': 3,
-            'retries': 3,
-        }
+        ydl_opts = dict(
+            _BASE_DOWNLOAD_OPTS,
+            outtmpl=base_output_path + '.%(ext)s',  # yt-dlp will add extension
+            progress_hooks=[YouTubeService._progress_hook],
+        )
         
         if proxy_url:
             ydl_opts['proxy'] = proxy_url
-            print(f"✅ Using proxy for video download")
         
         # Add cookies if configured (prioritize cookies file for server environments)
-        cookies_configured = False
         cookies_path = YouTubeService._resolve_cookies_path()
-        
         if cookies_path:
             ydl_opts['cookies'] = cookies_path
-            file_size = os.path.getsize(cookies_path)
-            print(f"✅ Using cookies from file: {cookies_path} ({file_size} bytes)")
-            cookies_configured = True
-        elif config.YOUTUBE_COOKIES_PATH:
-            print(f"❌ Cookies file not found at: {config.YOUTUBE_COOKIES_PATH}")
-            print(f"   Current working directory: {os.getcwd()}")
-            print(f"   Script directory: {os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}")
-        elif config.YOUTUBE_COOKIES_FROM_BROWSER:
-            # Try cookies_from_browser, but it may fail on servers
-            try:
-                ydl_opts['cookies_from_browser'] = (config.YOUTUBE_COOKIES_FROM_BROWSER,)
-                print(f"Attempting to use cookies from browser: {config.YOUTUBE_COOKIES_FROM_BROWSER}")
-                cookies_configured = True
-            except Exception as e:
-                print(f"Warning: cookies_from_browser not available: {e}")
-                print("Note: On servers (like Render), use YOUTUBE_COOKIES_PATH with a cookies.txt file instead")
+        elif config.YOUTUBE_COOKIES_FROM_BROWSER and not config.YOUTUBE_COOKIES_PATH:
+            # May fail on servers; yt-dlp reports that when it tries to read the browser
+            ydl_opts['cookies_from_browser'] = (config.YOUTUBE_COOKIES_FROM_BROWSER,)
         
-        # If no cookies configured, try mobile clients which sometimes bypass bot detection
-        if not cookies_configured:
-            print("⚠️ No cookies configured - using default clients (may still trigger bot detection)")
-            print("   Recommendation: Set YOUTUBE_COOKIES_PATH to a valid cookies.txt file")
-        else:
-            print(f"✅ Cookies configured - using authenticated requests")
+        # The proxy/cookie setup is fixed for the process, so report it once rather than per download
+        if not YouTubeService._setup_logged:
+            YouTubeService._setup_logged = True
+            YouTubeService._log_download_setup(cookies_path)
         
         # If the URL is just a video ID, construct full URL
         if not youtube_url.startswith('http'):
@@ -247,61 +468,53 @@ class YouTubeService:
         
         # Try download with multiple format strategies
         last_error = None
-        for format_idx, format_selector in enumerate(format_selectors):
+        attempts = list(enumerate(_FORMAT_SELECTORS))
+        if config.YOUTUBE_HEDGED_DOWNLOADS:
             try:
-                ydl_opts['format'] = format_selector
-                print(f"Attempting download with format selector {format_idx + 1}/{len(format_selectors)}: {format_selector[:50]}...")
+                downloaded, tried = YouTubeService._hedged_download(
+                    youtube_url, ydl_opts, base_output_path, output_path
+                )
+            except Exception as e:
+                downloaded, tried = False, 2
+                last_error = str(e)
+            if downloaded:
+                return output_path
+            attempts = attempts[tried:]
+        
+        for format_idx, format_selector in attempts:
+            try:
+                print(f"Attempting download with format selector {format_idx + 1}/{len(_FORMAT_SELECTORS)}: {format_selector[:50]}...")
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([youtube_url])
-                    
-                    # yt-dlp may have added an extension, check for the actual file
-                    possible_extensions = ['.mp4', '.webm', '.mkv', '.flv', '.m4a']
-                    
-                    for ext in possible_extensions:
-                        potential_path = base_output_path + ext
-                        if os.path.exists(potential_path) and os.path.getsize(potential_path) > 0:
-                            # Verify file is not empty
-                            file_size = os.path.getsize(potential_path)
-                            print(f"Downloaded file found: {potential_path} ({file_size} bytes)")
-                            
-                            # If the extension doesn't match what we want, rename it
-                            if potential_path != output_path:
-                                os.rename(potential_path, output_path)
-                            return output_path
-                    
-                    # If no file found with extensions, check if output_path already exists
-                    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
-                        return output_path
-                    
-                    # Last resort: check if base_output_path exists
-                    if os.path.exists(base_output_path) and os.path.getsize(base_output_path) > 0:
-                        os.rename(base_output_path, output_path)
-                        return output_path
-                    
-                    # If we got here, file is empty or doesn't exist
-                    if format_idx < len(format_selectors) - 1:
-                        print(f"Download attempt {format_idx + 1} failed: file empty or not found. Trying next format...")
-                        continue
-                    else:
-                        raise Exception(f"Downloaded file is empty or not found after all attempts")
+                downloaded_path = YouTubeService._download_attempt(
+                    youtube_url, ydl_opts, format_selector, base_output_path, output_path
+                )
+                if downloaded_path:
+                    if downloaded_path != output_path:
+                        os.rename(downloaded_path, output_path)
+                    return output_path
+                
+                # If we got here, file is empty or doesn't exist
+                if format_idx < len(_FORMAT_SELECTORS) - 1:
+                    print(f"Download attempt {format_idx + 1} failed: file empty or not found. Trying next format...")
+                    continue
+                else:
+                    raise Exception(f"Downloaded file is empty or not found after all attempts")
                         
             except Exception as e:
                 last_error = str(e)
                 print(f"Download attempt {format_idx + 1} failed: {last_error}")
                 
                 # If this was the last attempt, raise the error
-                if format_idx == len(format_selectors) - 1:
+                if format_idx == len(_FORMAT_SELECTORS) - 1:
                     # Clean up any empty files
-                    for ext in ['.mp4', '.webm', '.mkv', '.flv', '.m4a']:
-                        potential_path = base_output_path + ext
-                        if os.path.exists(potential_path) and os.path.getsize(potential_path) == 0:
+                    for potential_path, file_size in _downloaded_files(base_output_path, _POSSIBLE_EXTS):
+                        if file_size == 0:
                             try:
                                 os.remove(potential_path)
                             except:
                                 pass
                     
-                    raise Exception(f"Failed to download YouTube video after {len(format_selectors)} attempts. Last error: {last_error}")
+                    raise Exception(f"Failed to download YouTube video after {len(_FORMAT_SELECTORS)} attempts. Last error: {last_error}")
                 
                 # Continue to next format selector
                 continue
@@ -309,20 +522,174 @@ class YouTubeService:
         # Should not reach here, but just in case
         raise Exception(f"Failed to download YouTube video: {last_error or 'Unknown error'}")
     
+    @staticmethod
+    def _log_download_setup(cookies_path: Optional[str]):
+        """Describe the proxy and cookie configuration used for downloads"""
+        if config.PROXY_URL:
+            print(f"✅ Using proxy for yt-dlp requests")
+        
+        if cookies_path:
+            file_size = os.path.getsize(cookies_path)
+            print(f"✅ Using cookies from file: {cookies_path} ({file_size} bytes)")
+        elif config.YOUTUBE_COOKIES_PATH:
+            print(f"❌ Cookies file not found at: {config.YOUTUBE_COOKIES_PATH}")
+            print(f"   Current working directory: {os.getcwd()}")
+            print(f"   Script directory: {os.path.dirname(os.path.dirname(os.path.abspath(__file__)))}")
+        elif config.YOUTUBE_COOKIES_FROM_BROWSER:
+            print(f"Attempting to use cookies from browser: {config.YOUTUBE_COOKIES_FROM_BROWSER}")
+            print("Note: On servers (like Render), use YOUTUBE_COOKIES_PATH with a cookies.txt file instead")
+        
+        if cookies_path or (config.YOUTUBE_COOKIES_FROM_BROWSER and not config.YOUTUBE_COOKIES_PATH):
+            print(f"✅ Cookies configured - using authenticated requests")
+        else:
+            print("⚠️ No cookies configured - using default clients (may still trigger bot detection)")
+            print("   Recommendation: Set YOUTUBE_COOKIES_PATH to a valid cookies.txt file")
+    
+    @staticmethod
+    def _download_attempt(
+        youtube_url: str,
+        ydl_opts: dict,
+        format_selector: str,
+        attempt_base: str,
+        output_path: str,
+        cancel: Optional[threading.Event] = None,
+        started: Optional[threading.Event] = None,
+        on_started: Optional[Callable[[], None]] = None
+    ) -> Optional[str]:
+        """
+        One yt-dlp download with a single format selector into attempt_base + '.<ext>'.
+        Returns the path of the non-empty downloaded file, or None if nothing usable was written.
+        Setting `cancel` aborts the download at its next progress callback; `started` is set
+        (and `on_started` called, once) when bytes start arriving.
+        """
+        opts = dict(ydl_opts, format=format_selector, outtmpl=attempt_base + '.%(ext)s')
+        if cancel is not None or started is not None:
+            def attempt_hook(d):
+                if cancel is not None and cancel.is_set():
+                    raise DownloadCancelled('Superseded by another format attempt')
+                if started is not None and d['status'] == 'downloading' and not started.is_set():
+                    started.set()
+                    if on_started is not None:
+                        on_started()
+            opts['progress_hooks'] = ydl_opts['progress_hooks'] + [attempt_hook]
+        
+        with yt_dlp.YoutubeDL(opts) as ydl, _dns_cached():
+            ydl.download([youtube_url])
+        
+        # yt-dlp may have added an extension, check for the actual file
+        for potential_path, file_size in _downloaded_files(attempt_base, _POSSIBLE_EXTS):
+            # Verify file is not empty
+            if file_size > 0:
+                print(f"Downloaded file found: {potential_path} ({file_size} bytes)")
+                return potential_path
+        
+        # If no file found with extensions, check if output_path already exists
+        st = _stat_or_none(output_path)
+        if st and st.st_size > 0:
+            return output_path
+        
+        # Last resort: check if attempt_base exists
+        st = _stat_or_none(attempt_base)
+        if st and st.st_size > 0:
+            return attempt_base
+        
+        return None
+    
+    @staticmethod
+    def _hedged_download(
+        youtube_url: str,
+        ydl_opts: dict,
+        base_output_path: str,
+        output_path: str
+    ) -> Tuple[bool, int]:
+        """
+        Race the first two format selectors. The second only starts if the first hasn't
+        begun downloading within YOUTUBE_HEDGE_DELAY seconds, and as soon as either attempt
+        starts receiving bytes the other is cancelled, so only one ever downloads the video.
+        Each attempt writes to its own path so they never touch each other's files.
+        
+        Returns (downloaded, number of selectors tried). A selector cancelled in favour of
+        an attempt that then failed doesn't count as tried, so the serial loop retries it.
+        """
+        cancels = {}
+        winner_lock = threading.Lock()
+        winner = []
+        executor = ThreadPoolExecutor(max_workers=2)
+        attempts = {}
+        
+        def claim(idx):
+            # First attempt to start downloading wins; the other stops at its next callback
+            with winner_lock:
+                if winner:
+                    return
+                winner.append(idx)
+                for other, event in cancels.items():
+                    if other != idx:
+                        event.set()
+        
+        def submit(idx):
+            started = threading.Event()
+            with winner_lock:
+                cancels[idx] = threading.Event()
+                if winner:
+                    cancels[idx].set()
+            attempt_base = f"{base_output_path}.f{idx}"
+            print(f"Attempting download with format selector {idx + 1}/{len(_FORMAT_SELECTORS)}: {_FORMAT_SELECTORS[idx][:50]}...")
+            future = executor.submit(
+                YouTubeService._download_attempt, youtube_url, ydl_opts,
+                _FORMAT_SELECTORS[idx], attempt_base, output_path, cancels[idx], started,
+                functools.partial(claim, idx)
+            )
+            attempts[future] = (idx, attempt_base)
+            return future, started
+        
+        try:
+            first, started = submit(0)
+            wait([first], timeout=config.YOUTUBE_HEDGE_DELAY)
+            if not started.is_set() and not (first.done() and first.exception() is None and first.result()):
+                submit(1)
+            
+            pending = set(attempts)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx, _ = attempts[future]
+                    try:
+                        downloaded_path = future.result()
+                    except Exception as e:
+                        print(f"Download attempt {idx + 1} failed: {e}")
+                        continue
+                    if not downloaded_path:
+                        print(f"Download attempt {idx + 1} failed: file empty or not found")
+                        continue
+                    if downloaded_path != output_path:
+                        os.rename(downloaded_path, output_path)
+                    return True, len(attempts)
+            superseded = [idx for idx, _ in attempts.values() if winner and idx != winner[0]]
+            return False, min(superseded + [len(attempts)])
+        finally:
+            # Stop the losing attempt and remove whatever each attempt left behind
+            for event in cancels.values():
+                event.set()
+            for future, (_, attempt_base) in attempts.items():
+                future.add_done_callback(lambda _f, base=attempt_base: _remove_attempt_files(base))
+            executor.shutdown(wait=False)
+    
     @staticmethod
     def _progress_hook(d):
         """Progress hook for yt-dlp download"""
         if d['status'] == 'downloading':
+            # yt-dlp calls this for every block; log at most once per interval
+            now = time.monotonic()
+            if now - YouTubeService._last_progress_log < _PROGRESS_LOG_INTERVAL:
+                return
             p = d.get('downloaded_bytes', 0)
             t = d.get('total_bytes') or d.get('total_bytes_estimate')
             if t:
+                YouTubeService._last_progress_log = now
                 percent = int((p / t) * 100)
-                # Only log every 10% and avoid double logging same %
-                last_p = getattr(YouTubeService, '_last_percent', -1)
-                if percent % 10 == 0 and percent != last_p:
-                    YouTubeService._last_percent = percent
-                    speed = d.get('_speed_str', 'N/A')
-                    print(f"Download Progress: {percent}% at {speed}")
+                speed = d.get('_speed_str', 'N/A')
+                print(f"Download Progress: {percent}% at {speed}")
         elif d['status'] == 'finished':
             print(f"Download complete: {d['filename']}")
 
@@ -0,0 +1,24 @@
+import json
+import zlib
+from typing import Any
+
+# orjson is several times faster than the stdlib; fall back to json if it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def pack(obj: Any) -> bytes:
+    """Serialize to JSON and zlib-compress, for storing bulky values as BinData in MongoDB"""
+    if orjson is not None:
+        data = orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        data = json.dumps(obj, default=str).encode("utf-8")
+    return zlib.compress(data)
+
+
+def unpack(blob: bytes) -> Any:
+    """Inverse of pack()"""
+    data = zlib.decompress(blob)
+    return orjson.loads(data) if orjson is not None else json.loads(data)
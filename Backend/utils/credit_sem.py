@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Optional
+import config
+
+
+class CreditSemaphore:
+    """
+    Semaphore that hands out weighted credits instead of single slots.
+
+    Each call is charged by its estimated cost (audio seconds, tokens, requests)
+    and its credits are refunded `refund_time` seconds after it finishes, so a
+    capacity of N with refund_time=60 behaves like an "N per minute" quota.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._available = capacity
+        self._waiters: deque = deque()  # (credits, future), served FIFO
+        self._refunds: deque = deque()  # (wall-clock refund time, credits)
+
+    def _clamp(self, credits: float) -> float:
+        # A single call larger than the whole budget would otherwise wait forever
+        return min(max(credits, 0), self.capacity)
+
+    def _wake(self):
+        while self._waiters:
+            credits, fut = self._waiters[0]
+            if fut.done():
+                self._waiters.popleft()
+                continue
+            if credits > self._available:
+                break
+            self._waiters.popleft()
+            self._available -= credits
+            fut.set_result(True)
+
+    def _refund(self, credits: float, due: Optional[tuple] = None):
+        if due is not None:
+            try:
+                self._refunds.remove(due)
+            except ValueError:
+                pass
+        self._available += credits
+        self._wake()
+
+    def release(self, credits: float, refund_time: float = 0.0):
+        """Return credits now, or after refund_time seconds."""
+        credits = self._clamp(credits)
+        if refund_time <= 0:
+            self._refund(credits)
+            return
+        due = (time.time() + refund_time, credits)
+        self._refunds.append(due)
+        asyncio.get_running_loop().call_later(refund_time, self._refund, credits, due)
+
+    def try_acquire(self, credits: float) -> bool:
+        """Take credits without waiting. Returns False if they are not available."""
+        credits = self._clamp(credits)
+        if self._waiters or credits > self._available:
+            return False
+        self._available -= credits
+        return True
+
+    async def acquire(self, credits: float):
+        """Wait until credits are available and take them."""
+        credits = self._clamp(credits)
+        if self.try_acquire(credits):
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append((credits, fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Credits were granted just as we were cancelled; hand them back
+                self._refund(credits)
+            raise
+
+    def retry_at(self, credits: float, refund_time: float = 0.0) -> float:
+        """Best guess (wall clock) of when `credits` could be acquired."""
+        credits = self._clamp(credits)
+        available = self._available
+        for due, refunded in sorted(self._refunds):
+            available += refunded
+            if available >= credits:
+                return due
+        # Still held by in-flight calls; assume they finish now and refund later
+        return time.time() + refund_time
+
+    async def transact(
+        self,
+        coro: Awaitable,
+        credits: float,
+        refund_time: float = 0.0,
+        blocking: bool = True
+    ) -> Any:
+        """
+        Run `coro` once `credits` are available, refunding them refund_time
+        seconds after it finishes.
+
+        With blocking=False nothing waits: if the budget is exhausted the
+        coroutine is not run and {"retry_at": <unix time>} is returned instead.
+        """
+        if blocking:
+            await self.acquire(credits)
+        elif not self.try_acquire(credits):
+            if hasattr(coro, "close"):
+                coro.close()
+            return {"retry_at": self.retry_at(credits, refund_time)}
+
+        try:
+            return await coro
+        finally:
+            self.release(credits, refund_time)
+
+
+def is_rate_limited(result: Any) -> bool:
+    """True if a non-blocking transact() declined to run the call."""
+    return isinstance(result, dict) and set(result) == {"retry_at"}
+
+
+# Shared Gemini budgets for every job in this process (limits in config.py)
+transcribe_credits = CreditSemaphore(config.GEMINI_AUDIO_SECONDS_PER_MINUTE)
+vision_requests = CreditSemaphore(config.GEMINI_VISION_RPM)
+vision_tokens = CreditSemaphore(config.GEMINI_VISION_TPM)
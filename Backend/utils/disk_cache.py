@@ -0,0 +1,58 @@
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+from utils.compression import pack, unpack
+
+
+class DiskCache:
+    """
+    Small TTL'd key/value cache in a sqlite file, shared by every thread in the process.
+    Values are stored with utils.compression.pack, so anything JSON-serialisable works.
+    """
+
+    def __init__(self, path: str, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            # WAL lets readers in other processes (e.g. image worker pools) proceed during writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, ts REAL)"
+            )
+            # Expired rows are never read again; drop them so the file doesn't grow without bound
+            self._conn.execute("DELETE FROM cache WHERE ts < ?", (time.time() - ttl,))
+            self._conn.commit()
+        except sqlite3.Error as e:
+            # Another process may hold the lock; get/set treat any failure as a miss
+            print(f"Cache setup failed for {path}: {e}")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for key, or None if missing or older than the TTL"""
+        if self.ttl <= 0:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT value, ts FROM cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            # A cache that can't be read (e.g. locked by another process) is just a miss
+            print(f"Cache read failed: {e}")
+            return None
+        if row is None or time.time() - row[1] >= self.ttl:
+            return None
+        return unpack(row[0])
+
+    def set(self, key: str, value: Any):
+        if self.ttl <= 0:
+            return
+        blob = pack(value)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, ts) VALUES (?, ?, ?)",
+                    (key, blob, time.time())
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"Cache write failed: {e}")
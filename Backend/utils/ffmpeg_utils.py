@@ -1,9 +1,18 @@
 import subprocess
+import functools
+import glob
 import os
 import re
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple
 import config
 
+# "Duration: HH:MM:SS.ms" line of `ffmpeg -i` output
+_DURATION_RE = re.compile(r'Duration: (\d+):(\d+):(\d+\.\d+)')
+# Timestamp of each frame reported by the showinfo filter
+_SHOWINFO_PTS_RE = re.compile(r'Parsed_showinfo.*? pts_time:\s*(-?[\d.]+)')
+
 # Use imageio-ffmpeg's bundled FFmpeg binary
 try:
     import imageio_ffmpeg
@@ -13,6 +22,19 @@ except (ImportError, RuntimeError):
     FFMPEG_PATH = 'ffmpeg'
     print("⚠️  imageio-ffmpeg not found, falling back to system ffmpeg")
 
+# Input options for the single-pass frame extractions. Decoding dominates those runs; with
+# "auto" ffmpeg decodes on the GPU when it can and quietly uses software otherwise. The
+# per-frame / per-window seeks below decode too little for GPU setup to pay off.
+HWACCEL_ARGS = [] if config.FFMPEG_HWACCEL in ('', 'none') else ['-hwaccel', config.FFMPEG_HWACCEL]
+
+
+def _map_ffmpeg(func, items: list) -> list:
+    """func(*args) for each args tuple; the calls are independent ffmpeg processes, run a few at once"""
+    # Each decoder already uses a core or two, so stay at half the CPUs
+    workers = max(1, (os.cpu_count() or 1) // 2)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda args: func(*args), items))
+
 
 class FFmpegUtils:
     @staticmethod
@@ -20,7 +42,8 @@ class FFmpegUtils:
         """Check if FFmpeg is available"""
         try:
             subprocess.run([FFMPEG_PATH, '-version'], 
-                         capture_output=True, 
+                         stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL,
                          check=True,
                          timeout=5)
             return True
@@ -29,10 +52,20 @@ class FFmpegUtils:
     
     @staticmethod
     def get_video_duration(video_path: str) -> float:
-        """Get video duration in seconds using ffmpeg"""
+        """Get video duration in seconds using ffmpeg (cached per file version)"""
         # Convert to absolute path
         video_path = os.path.abspath(video_path)
         
+        try:
+            st = os.stat(video_path)
+        except OSError:
+            return FFmpegUtils._probe_duration(video_path, 0, 0)
+        # Keyed on mtime and size as well, so a rewritten file is probed again
+        return FFmpegUtils._probe_duration(video_path, st.st_mtime_ns, st.st_size)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _probe_duration(video_path: str, mtime_ns: int, size: int) -> float:
         try:
             # Use ffmpeg to get duration from the file
             cmd = [
@@ -40,11 +73,11 @@ class FFmpegUtils:
                 '-i', video_path
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=30)
             output = result.stderr  # ffmpeg outputs to stderr
             
             # Parse duration from output: Duration: HH:MM:SS.ms
-            match = re.search(r'Duration: (\d+):(\d+):(\d+\.\d+)', output)
+            match = _DURATION_RE.search(output)
             if match:
                 hours = int(match.group(1))
                 minutes = int(match.group(2))
@@ -77,9 +110,15 @@ class FFmpegUtils:
         Returns:
             Path to extracted audio file
         """
-        cmd = [
+        cmd = FFmpegUtils._audio_cmd(video_path, output_path, sample_rate)
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True, timeout=300)
+        return output_path
+    
+    @staticmethod
+    def _audio_cmd(input_path: str, output_path: str, sample_rate: int) -> List[str]:
+        return [
             FFMPEG_PATH,
-            '-i', video_path,
+            '-i', input_path,
             '-vn',  # No video
             '-acodec', 'pcm_s16le',  # PCM 16-bit
             '-ar', str(sample_rate),  # Sample rate
@@ -87,9 +126,46 @@ class FFmpegUtils:
             '-y',  # Overwrite output
             output_path
         ]
+    
+    @staticmethod
+    def open_audio_pipe(
+        output_path: str,
+        sample_rate: int = config.AUDIO_SAMPLE_RATE
+    ) -> subprocess.Popen:
+        """
+        Start an ffmpeg process that extracts audio from video bytes written to its stdin,
+        so audio can be produced while the video is still downloading.
+        Finish with close_audio_pipe().
+        """
+        return subprocess.Popen(
+            FFmpegUtils._audio_cmd('pipe:0', output_path, sample_rate),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    
+    @staticmethod
+    def close_audio_pipe(proc: subprocess.Popen, output_path: str) -> bool:
+        """
+        Close the input of an open_audio_pipe() process and wait for it.
+        Returns True if the audio file was produced; otherwise removes any partial output
+        (e.g. MP4s with the index at the end cannot be decoded from a pipe).
+        """
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=300)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
         
-        subprocess.run(cmd, capture_output=True, check=True, timeout=300)
-        return output_path
+        if proc.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+            return True
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False
     
     @staticmethod
     def split_audio(
@@ -108,8 +184,15 @@ class FFmpegUtils:
         Returns:
             List of tuples: (chunk_path, start_time, end_time)
         """
-        # Get total duration
-        duration = FFmpegUtils.get_video_duration(audio_path)
+        # Our WAVs are plain PCM: read the header directly and slice the samples in
+        # Python; anything else goes through ffmpeg
+        try:
+            with wave.open(audio_path, 'rb') as src:
+                params = src.getparams()
+            duration = params.nframes / params.framerate
+        except (wave.Error, EOFError):
+            params = None
+            duration = FFmpegUtils.get_video_duration(audio_path)
         
         chunks = []
         current_time = 0
@@ -120,26 +203,40 @@ class FFmpegUtils:
         while current_time < duration:
             end_time = min(current_time + chunk_duration, duration)
             chunk_path = f"{base_name}_chunk_{chunk_index}.wav"
-            
-            # Extract chunk
-            cmd = [
-                FFMPEG_PATH,
-                '-i', audio_path,
-                '-ss', str(current_time),
-                '-t', str(end_time - current_time),
-                '-acodec', 'copy',
-                '-y',
-                chunk_path
-            ]
-            
-            subprocess.run(cmd, capture_output=True, check=True, timeout=300)
-            
             chunks.append((chunk_path, current_time, end_time))
             
             # Move forward, accounting for overlap
             current_time += chunk_duration - overlap
             chunk_index += 1
         
+        if not chunks:
+            return chunks
+        
+        if params is not None:
+            with wave.open(audio_path, 'rb') as src:
+                for chunk_path, start_time, end_time in chunks:
+                    start = int(start_time * params.framerate)
+                    src.setpos(start)
+                    data = src.readframes(int(end_time * params.framerate) - start)
+                    with wave.open(chunk_path, 'wb') as dst:
+                        dst.setparams(params)
+                        dst.writeframes(data)
+            return chunks
+        
+        # One ffmpeg reads the file once and writes every (possibly overlapping)
+        # chunk as its own output, instead of one process per chunk
+        cmd = [FFMPEG_PATH, '-y', '-i', audio_path]
+        for chunk_path, start_time, end_time in chunks:
+            cmd += [
+                '-map', '0:a',
+                '-ss', str(start_time),
+                '-t', str(end_time - start_time),
+                '-acodec', 'copy',
+                chunk_path
+            ]
+        
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True, timeout=300)
+        
         return chunks
     
     @staticmethod
@@ -161,18 +258,50 @@ class FFmpegUtils:
         """
         os.makedirs(output_dir, exist_ok=True)
         
-        duration = FFmpegUtils.get_video_duration(video_path)
-        frames = []
+        # A seek per frame decodes roughly one GOP each, while the fps filter below
+        # decodes the whole file (on a 15-min 720p video at a 30s interval: ~1s vs ~26s).
+        # Only short intervals, where the seeks would decode most of the file anyway,
+        # go through the single pass
+        if interval >= config.KEYFRAME_SINGLE_PASS_MAX_INTERVAL:
+            return FFmpegUtils._extract_keyframes_by_seek(video_path, output_dir, interval)
         
-        current_time = 0
-        frame_index = 0
+        # One decode pass: the fps filter emits a frame every `interval` seconds
+        cmd = [
+            FFMPEG_PATH,
+            *HWACCEL_ARGS,
+            '-i', video_path,
+            '-vf', f'fps=1/{interval}',
+            '-q:v', '2',  # High quality
+            '-start_number', '0',
+            '-y',
+            os.path.join(output_dir, 'frame_%04d.jpg')
+        ]
         
-        while current_time <= duration:
+        try:
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True, timeout=600)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            print(f"Single-pass keyframe extraction failed ({e}), falling back to per-frame seeks")
+            return FFmpegUtils._extract_keyframes_by_seek(video_path, output_dir, interval)
+        
+        # frame_0000.jpg is t=0, frame_0001.jpg is t=interval, ...
+        frame_paths = sorted(glob.glob(os.path.join(output_dir, 'frame_[0-9][0-9][0-9][0-9].jpg')))
+        return [(path, float(i * interval)) for i, path in enumerate(frame_paths)]
+    
+    @staticmethod
+    def _extract_keyframes_by_seek(
+        video_path: str,
+        output_dir: str,
+        interval: int
+    ) -> List[Tuple[str, float]]:
+        """One seek-and-grab ffmpeg call per frame, a few at a time"""
+        duration = FFmpegUtils.get_video_duration(video_path)
+        
+        def grab(frame_index: int, timestamp: float) -> List[Tuple[str, float]]:
             frame_path = os.path.join(output_dir, f"frame_{frame_index:04d}.jpg")
             
             cmd = [
                 FFMPEG_PATH,
-                '-ss', str(current_time),
+                '-ss', str(timestamp),
                 '-i', video_path,
                 '-frames:v', '1',
                 '-q:v', '2',  # High quality
@@ -181,16 +310,21 @@ class FFmpegUtils:
             ]
             
             try:
-                subprocess.run(cmd, capture_output=True, check=True, timeout=60)
-                frames.append((frame_path, current_time))
-                frame_index += 1
-            except subprocess.CalledProcessError:
+                subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True, timeout=60)
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
                 # Skip if frame extraction fails
-                pass
-            
+                return []
+            # A seek at (or past) the very end can succeed without writing a frame
+            return [(frame_path, timestamp)] if os.path.exists(frame_path) else []
+        
+        timestamps = []
+        current_time = 0
+        while current_time <= duration:
+            timestamps.append(float(current_time))
             current_time += interval
         
-        return frames
+        results = _map_ffmpeg(grab, list(enumerate(timestamps)))
+        return [frame for frames in results for frame in frames]
     
     @staticmethod
     def extract_dense_frames(
@@ -212,14 +346,61 @@ class FFmpegUtils:
             List of tuples: (frame_path, timestamp)
         """
         os.makedirs(output_dir, exist_ok=True)
-        all_frames = []
         
         print(f"Extracting dense frames for {len(time_windows)} windows...")
         
-        for i, (start, end) in enumerate(time_windows):
+        windows = [(start, end) for start, end in time_windows if end > start]
+        if not windows:
+            return []
+        
+        # Seeking to each window decodes just that window, where a single pass decodes
+        # the whole file (3 windows on a 15-min 720p video: ~2s vs ~26s); the pass only
+        # wins once the windows cover most of the video
+        duration = FFmpegUtils.get_video_duration(video_path)
+        coverage = sum(end - start for start, end in windows) / max(duration, 1)
+        if coverage < config.DENSE_SINGLE_PASS_COVERAGE:
+            return FFmpegUtils._extract_dense_frames_per_window(video_path, output_dir, windows, fps)
+        
+        # One decode pass for all windows: sample at `fps`, keep only frames inside a
+        # window, and let showinfo report each kept frame's timestamp
+        select_expr = "+".join(f"between(t,{start},{end})" for start, end in windows)
+        cmd = [
+            FFMPEG_PATH,
+            *HWACCEL_ARGS,
+            '-i', video_path,
+            '-vf', f"fps={fps},select='{select_expr}',showinfo",
+            '-vsync', 'vfr',
+            '-q:v', '2',
+            '-y',
+            os.path.join(output_dir, 'dense_%05d.jpg')
+        ]
+        
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True, timeout=600)
+            timestamps = [float(ts) for ts in _SHOWINFO_PTS_RE.findall(result.stderr)]
+            frame_paths = [
+                os.path.join(output_dir, f"dense_{n:05d}.jpg")
+                for n in range(1, len(timestamps) + 1)
+            ]
+            if timestamps and not os.path.exists(frame_paths[-1]):
+                raise ValueError("frame files don't match the reported timestamps")
+            return sorted(zip(frame_paths, timestamps), key=lambda x: x[1])
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError) as e:
+            print(f"Single-pass dense extraction failed ({e}), falling back to one ffmpeg per window")
+            return FFmpegUtils._extract_dense_frames_per_window(video_path, output_dir, windows, fps)
+    
+    @staticmethod
+    def _extract_dense_frames_per_window(
+        video_path: str,
+        output_dir: str,
+        time_windows: List[Tuple[float, float]],
+        fps: int
+    ) -> List[Tuple[str, float]]:
+        """A separate seek + ffmpeg call per window, a few at a time"""
+        def extract_window(i: int, start: float, end: float) -> List[Tuple[str, float]]:
             duration = end - start
             if duration <= 0:
-                continue
+                return []
                 
             # Create a pattern that includes the timestamp to avoid collisions
             # We'll use a unique prefix for each window to ensure no overwrites
@@ -245,48 +426,44 @@ class FFmpegUtils:
                 window_output_pattern
             ]
             
+            frames = []
             try:
-                subprocess.run(cmd, capture_output=True, check=True, timeout=120)
+                subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, check=True, timeout=120)
                 
                 # Now collect the generated files and map them to timestamps
                 # The files will be win_0_0001.jpg, win_0_0002.jpg etc.
                 # Timestamp = start + (index-1)/fps
                 
-                for filename in sorted(os.listdir(output_dir)):
-                    if filename.startswith(f"win_{i}_") and filename.endswith(".jpg"):
-                        # Parse frame number
-                        try:
-                            # win_0_0001.jpg -> 1
-                            frame_num = int(filename.split('_')[-1].split('.')[0])
-                            
-                            # Calculate timestamp: start + (frame_num - 1) / fps
-                            # FFmpeg usually starts at 0 or 1 depending on version/settings
-                            # but with fps filter, the first frame is usually at relative t=0 or t=0.5/fps
-                            # Approximation is fine for now.
-                            
-                            timestamp = start + (frame_num - 1) / fps
-                            full_path = os.path.join(output_dir, filename)
-                            
-                            # Rename to something more semantic: frame_{timestamp}s.jpg
-                            # to match the rest of the pipeline if needed, OR just keep it.
-                            # Let's rename for clarity: frame_00000_12s.jpg (5 digits for seconds)
-                            
-                            safe_ts_str = f"{int(timestamp):05d}"
-                            new_name = f"frame_{safe_ts_str}_{i}_{frame_num}.jpg"
-                            new_path = os.path.join(output_dir, new_name)
-                            
-                            if not os.path.exists(new_path): # Avoid double rename if running multiple times
-                                os.rename(full_path, new_path)
-                                all_frames.append((new_path, timestamp))
-                            else:
-                                all_frames.append((new_path, timestamp))
-                                
-                        except ValueError:
-                            continue
-                            
+                # Only this window's files, rather than listing the whole (growing) directory
+                for full_path in sorted(glob.glob(os.path.join(output_dir, f"win_{i}_*.jpg"))):
+                    filename = os.path.basename(full_path)
+                    # Parse frame number
+                    try:
+                        # win_0_0001.jpg -> 1
+                        frame_num = int(filename.split('_')[-1].split('.')[0])
+                        
+                        # Calculate timestamp: start + (frame_num - 1) / fps
+                        # FFmpeg usually starts at 0 or 1 depending on version/settings
+                        # but with fps filter, the first frame is usually at relative t=0 or t=0.5/fps
+                        # Approximation is fine for now.
+                        
+                        timestamp = start + (frame_num - 1) / fps
+                        
+                        # The timestamp travels in the tuple, so the file keeps ffmpeg's name
+                        frames.append((full_path, timestamp))
+                        
+                    except ValueError:
+                        continue
+                        
             except subprocess.CalledProcessError as e:
                 print(f"Error extracting dense frames for window {start}-{end}: {e}")
-                
+            return frames
+        
+        results = _map_ffmpeg(extract_window, [
+            (i, start, end) for i, (start, end) in enumerate(time_windows)
+        ])
+        all_frames = [frame for frames in results for frame in frames]
+        
         return sorted(all_frames, key=lambda x: x[1])
 
     @staticmethod
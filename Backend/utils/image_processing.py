@@ -1,8 +1,55 @@
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional
+import functools
+import hashlib
+import io
 import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 # import cv2 # Removed to avoid numpy version conflict
 # import numpy as np
 from PIL import Image, ImageFilter, ImageStat
+import config
+from utils.disk_cache import DiskCache
+
+# Below this many images the process round-trips cost more than they save
+_PARALLEL_MIN_IMAGES = 16
+# Clusters larger than this are blur-ranked from a sample (see cluster_frames)
+_BLUR_SAMPLE_MIN = 20
+_BLUR_SAMPLE_STRIDE = 3
+_BLUR_FINALISTS = 10
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _map_images(func: Callable, paths: List[str]) -> list:
+    """func over each path, spread across worker processes for large batches"""
+    if config.IMAGE_WORKERS <= 1 or len(paths) < _PARALLEL_MIN_IMAGES:
+        return [func(path) for path in paths]
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the server process has threads, which don't mix with fork
+            _pool = ProcessPoolExecutor(
+                max_workers=config.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+    return list(_pool.map(func, paths, chunksize=8))
+
+
+# dHash by frame content, shared by reruns and worker processes (each opens it on first use)
+_phash_cache: Optional[DiskCache] = None
+
+
+def _get_phash_cache() -> DiskCache:
+    global _phash_cache
+    if _phash_cache is None:
+        _phash_cache = DiskCache(
+            os.path.join(config.TEMP_DIR, "phash-cache.sqlite3"),
+            config.PHASH_CACHE_TTL_DAYS * 86400
+        )
+    return _phash_cache
+
 
 class ImageProcessor:
     """Utilities for image processing, deduplication, and quality assessment."""
@@ -17,44 +64,65 @@ class ImageProcessor:
             # Check if file exists
             if not os.path.exists(image_path):
                 return None
-                
-            # Use PIL to open and convert to grayscale
-            with Image.open(image_path) as img:
-                img = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
-                pixels = list(img.getdata())
-                
-            # Compare adjacent pixels
-            diff = []
-            for row in range(hash_size):
-                for col in range(hash_size):
-                    pixel_left = pixels[row * (hash_size + 1) + col]
-                    pixel_right = pixels[row * (hash_size + 1) + col + 1]
-                    diff.append(pixel_left > pixel_right)
-                    
-            # Convert binary array to hex string
-            decimal_value = 0
-            hex_string = []
-            for index, value in enumerate(diff):
-                if value:
-                    decimal_value += 2**(index % 8)
-                if (index % 8) == 7:
-                    hex_string.append(hex(decimal_value)[2:].rjust(2, '0'))
-                    decimal_value = 0
-                    
-            return "".join(hex_string)
+            
+            # Re-extracted frames are byte-identical, so a rerun hashes the file
+            # contents (cheap) instead of decoding and resizing the image again
+            with open(image_path, "rb") as f:
+                data = f.read()
+            cache_key = f"{hashlib.sha1(data).hexdigest()}:{hash_size}"
+            cache = _get_phash_cache()
+            phash = cache.get(cache_key)
+            if phash is None:
+                with Image.open(io.BytesIO(data)) as img:
+                    phash = ImageProcessor._dhash(img, hash_size)
+                cache.set(cache_key, phash)
+            return phash
             
         except Exception as e:
             print(f"Error calculating hash for {image_path}: {e}")
             return None
 
     @staticmethod
-    def calculate_blur(image_path: str) -> float:
+    def _dhash(img: Image.Image, hash_size: int) -> str:
+        """dHash of an open PIL image as a hex string"""
+        # Convert to grayscale
+        img = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+
+        pixels = list(img.getdata())
+
+        # Compare adjacent pixels
+        diff = []
+        for row in range(hash_size):
+            for col in range(hash_size):
+                pixel_left = pixels[row * (hash_size + 1) + col]
+                pixel_right = pixels[row * (hash_size + 1) + col + 1]
+                diff.append(pixel_left > pixel_right)
+
+        # Convert binary array to hex string
+        decimal_value = 0
+        hex_string = []
+        for index, value in enumerate(diff):
+            if value:
+                decimal_value += 2**(index % 8)
+            if (index % 8) == 7:
+                hex_string.append(hex(decimal_value)[2:].rjust(2, '0'))
+                decimal_value = 0
+
+        return "".join(hex_string)
+
+    @staticmethod
+    def calculate_blur(image_path: str, max_dim: Optional[int] = 256) -> float:
         """
         Calculate sharpness score using PIL (variance of edges).
-        Higher is sharper.
+        Higher is sharper. Scored on a copy downscaled to max_dim (None = full size),
+        which is plenty for ranking similar frames against each other.
         """
         try:
             with Image.open(image_path) as img:
+                if max_dim:
+                    # draft() lets the JPEG decoder skip most of the full-size decode
+                    img.draft("L", (max_dim, max_dim))
+                    img.thumbnail((max_dim, max_dim), Image.Resampling.BILINEAR)
                 img = img.convert("L")
                 edges = img.filter(ImageFilter.FIND_EDGES)
                 stat = ImageStat.Stat(edges)
@@ -64,72 +132,107 @@ class ImageProcessor:
             return 0.0
 
     @staticmethod
-    def cluster_frames(frames: List[Tuple[str, float]], threshold: int = 10) -> List[Dict]:
+    def calculate_phashes(image_paths: List[str]) -> List[Optional[str]]:
+        """calculate_phash for many images, in parallel when there are enough of them"""
+        return _map_images(ImageProcessor.calculate_phash, image_paths)
+
+    @staticmethod
+    def calculate_blurs(image_paths: List[str], max_dim: Optional[int] = 256) -> List[float]:
+        """calculate_blur for many images, in parallel when there are enough of them"""
+        return _map_images(functools.partial(ImageProcessor.calculate_blur, max_dim=max_dim), image_paths)
+
+    @staticmethod
+    def hamming_distance(h1: Optional[str], h2: Optional[str]) -> int:
+        """Number of differing bits between two hex hashes (64 if either is missing)."""
+        if not h1 or not h2: return 64
+        return (int(h1, 16) ^ int(h2, 16)).bit_count()
+
+    @staticmethod
+    def _adjacent_distances(hashes: List[str]) -> List[int]:
+        """Hamming distance between each pair of consecutive hex hashes"""
+        # Parse each hash once; adjacent frames are compared by XOR + popcount
+        ints = [int(h, 16) for h in hashes]
+        return [(a ^ b).bit_count() for a, b in zip(ints, ints[1:])]
+
+    @staticmethod
+    def cluster_frames(
+        frames: List[Tuple[str, float]],
+        threshold: int = 10,
+        known_hashes: Optional[Dict[str, str]] = None,
+        max_cluster_gap: Optional[float] = None
+    ) -> List[Dict]:
         """
         Cluster similar frames based on perceptual hash.
         
         Args:
             frames: List of (path, timestamp) tuples
             threshold: Hamming distance threshold for similarity (0-64). Lower = stricter.
+            known_hashes: Optional path -> hash map (e.g. from an earlier clustering of
+                the same files); only frames missing from it are hashed.
+            max_cluster_gap: Optional max seconds between consecutive frames of a cluster;
+                frames further apart are split without comparing their hashes.
             
         Returns:
-            List of clusters (dicts with 'frames', 'start_time', 'end_time', 'key_frame')
+            List of clusters (dicts with 'start_time', 'end_time', 'frame_count', 'candidates'
+            (the sharpest 5 frames) and 'frames' (every frame in the cluster))
         """
         if not frames:
             return []
             
-        clusters = []
-        current_cluster = []
         last_hash = None
         
-        # Helper to calculate hamming distance
-        def hamming_distance(h1, h2):
-            if not h1 or not h2: return 64
-            bin1 = bin(int(h1, 16))[2:].zfill(64)
-            bin2 = bin(int(h2, 16))[2:].zfill(64)
-            return sum(b1 != b2 for b1, b2 in zip(bin1, bin2))
-
         # Calculate hashes for all frames
         frame_hashes = []
+        known_hashes = known_hashes or {}
+        to_hash = [path for path, _ in frames if not known_hashes.get(path)]
+        computed = dict(zip(to_hash, ImageProcessor.calculate_phashes(to_hash)))
         for path, ts in frames:
-            phash = ImageProcessor.calculate_phash(path)
+            phash = known_hashes.get(path) or computed[path]
             if phash:
                 frame_hashes.append({'path': path, 'timestamp': ts, 'hash': phash, 'blur_score': 0})
         
         if not frame_hashes:
             return []
 
-        # Start clustering
-        current_cluster = [frame_hashes[0]]
-        
-        for i in range(1, len(frame_hashes)):
-            frame = frame_hashes[i]
-            prev_frame = frame_hashes[i-1]
-            
-            dist = hamming_distance(frame['hash'], prev_frame['hash'])
+        # Start clustering: a new cluster begins wherever a frame differs too much from the previous one.
+        # Frames more than max_cluster_gap apart always split, so hashes are only compared within runs
+        gaps = []
+        if max_cluster_gap is not None:
+            gaps = [i for i in range(1, len(frame_hashes))
+                    if frame_hashes[i]['timestamp'] - frame_hashes[i - 1]['timestamp'] > max_cluster_gap]
+        breaks = []
+        for start, end in zip([0] + gaps, gaps + [len(frame_hashes)]):
+            if start:
+                breaks.append(start)
+            dists = ImageProcessor._adjacent_distances([f['hash'] for f in frame_hashes[start:end]])
+            breaks += [start + i for i, dist in enumerate(dists, 1) if dist > threshold]
+        bounds = [0] + breaks + [len(frame_hashes)]
+        clusters = [frame_hashes[start:end] for start, end in zip(bounds, bounds[1:])]
             
-            # If similar, add to current cluster
-            if dist <= threshold:
-                current_cluster.append(frame)
-            else:
-                # Close current cluster and start new one
-                clusters.append(current_cluster)
-                current_cluster = [frame]
+        # Calculate blur scores for ranking in clusters > 1 (all in one batch).
+        # Large clusters are runs of near-duplicates: only every 3rd frame is scored,
+        # and the best of those are re-scored at full size to pick the candidates
+        small = [f for cluster in clusters if 1 < len(cluster) <= _BLUR_SAMPLE_MIN for f in cluster]
+        large = [cluster for cluster in clusters if len(cluster) > _BLUR_SAMPLE_MIN]
+        to_score = small + [f for cluster in large for f in cluster[::_BLUR_SAMPLE_STRIDE]]
+        for f, score in zip(to_score, ImageProcessor.calculate_blurs([f['path'] for f in to_score])):
+            f['blur_score'] = score
         
-        # Add the last cluster
-        if current_cluster:
-            clusters.append(current_cluster)
+        finalists = []
+        for cluster in large:
+            sampled = cluster[::_BLUR_SAMPLE_STRIDE]
+            finalists += sorted(sampled, key=lambda x: x['blur_score'], reverse=True)[:_BLUR_FINALISTS]
+            # Thumbnail scores must not compete with the full-size finalist scores
+            for f in sampled:
+                f['blur_score'] = 0
+        full_scores = ImageProcessor.calculate_blurs([f['path'] for f in finalists], max_dim=None)
+        for f, score in zip(finalists, full_scores):
+            f['blur_score'] = score
             
         # Process clusters to be ready for Gemini
         processed_clusters = []
         for cluster in clusters:
-            # Calculate blur scores for ranking if cluster is large
-            # We only need to calculate scores for the top candidates or all if cluster is small
-            # For simplicity, calculate for all in clusters > 1
-            if len(cluster) > 1:
-                for f in cluster:
-                    f['blur_score'] = ImageProcessor.calculate_blur(f['path'])
-            else:
+            if len(cluster) == 1:
                 cluster[0]['blur_score'] = 100.0 # Default high score for single frame
 
             # Sort by sharpness (descending)
@@ -142,7 +245,8 @@ class ImageProcessor:
                 "start_time": min(f['timestamp'] for f in cluster),
                 "end_time": max(f['timestamp'] for f in cluster),
                 "frame_count": len(cluster),
-                "candidates": candidates # List of dicts with path, timestamp, blur_score
+                "candidates": candidates, # List of dicts with path, timestamp, blur_score
+                "frames": cluster
             })
             
         return processed_clusters
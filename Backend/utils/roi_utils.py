@@ -1,5 +1,9 @@
 from typing import List, Dict, Tuple
 import math
+import re
+
+# HH:MM:SS or MM:SS (seconds may be fractional)
+_TIMESTAMP_RE = re.compile(r'^\s*(?:(\d+):)?(\d+):(\d+(?:\.\d*)?)\s*$')
 
 def merge_time_windows(
     audio_cues: List[Dict], 
@@ -29,19 +33,16 @@ def merge_time_windows(
     for cue in audio_cues:
         ts = cue.get("timestamp")
         if isinstance(ts, str):
-            # Parse HH:MM:SS
+            # Parse HH:MM:SS or MM:SS, else plain seconds
             try:
-                parts = ts.split(':')
-                if len(parts) == 3:
-                    h, m, s = map(float, parts)
-                    seconds = h * 3600 + m * 60 + s
-                elif len(parts) == 2:
-                    m, s = map(float, parts)
-                    seconds = m * 60 + s
+                match = _TIMESTAMP_RE.match(ts)
+                if match:
+                    h, m, s = match.groups()
+                    seconds = int(h or 0) * 3600 + int(m) * 60 + float(s)
                 else:
                     seconds = float(ts)
                 timestamps.append(seconds)
-            except:
+            except ValueError:
                 continue
         elif isinstance(ts, (int, float)):
             timestamps.append(float(ts))
@@ -55,30 +56,26 @@ def merge_time_windows(
     if not timestamps:
         return []
         
-    # 2. Create initial windows [T - buffer, T + buffer]
-    windows = []
-    for ts in timestamps:
-        start = max(0, ts - buffer_seconds)
-        end = min(total_duration, ts + buffer_seconds)
-        windows.append((start, end))
-        
-    # Sort by start time
-    windows.sort(key=lambda x: x[0])
+    # 2. Every window is [T - buffer, T + buffer] clipped to the video, so sorting
+    # the timestamps already orders the windows by start time
+    timestamps.sort()
     
-    # 3. Merge overlapping or close windows
-    if not windows:
-        return []
-        
-    merged = [windows[0]]
+    # 3. Merge overlapping or close windows in one sweep, without building them first
+    merged = []
+    last_start = max(0, timestamps[0] - buffer_seconds)
+    last_end = min(total_duration, timestamps[0] + buffer_seconds)
     
-    for current_start, current_end in windows[1:]:
-        last_start, last_end = merged[-1]
+    for ts in timestamps[1:]:
+        current_start = max(0, ts - buffer_seconds)
+        current_end = min(total_duration, ts + buffer_seconds)
         
         # If overlap or gap is small enough, merge
         if current_start <= last_end + min_gap:
-            new_end = max(last_end, current_end)
-            merged[-1] = (last_start, new_end)
+            if current_end > last_end:
+                last_end = current_end
         else:
-            merged.append((current_start, current_end))
-            
+            merged.append((last_start, last_end))
+            last_start, last_end = current_start, current_end
+    
+    merged.append((last_start, last_end))
     return merged